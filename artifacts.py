@@ -0,0 +1,183 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+MANIFEST_PATH = "artifact_manifest.json"
+# total bytes kept on disk by the store before least recently used items go
+DISK_QUOTA_BYTES = int(
+    float(os.environ.get("DASHBOARD_DISK_QUOTA_GB", "5")) * 1024**3
+)
+# seconds an artifact is trusted before the server is asked if it changed
+REVALIDATE_AFTER = 3600
+
+
+def disk_size(path):
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(folder, name))
+            for folder, _, names in os.walk(path)
+            for name in names
+        )
+    if os.path.exists(path):
+        return os.path.getsize(path)
+    return 0
+
+
+class ArtifactStore:
+    """Manifest of everything the dashboard downloads, with an LRU disk quota.
+
+    Each entry is keyed by the local path it was saved to and records the
+    remote path, size, ETag/Last-Modified, the paths it occupies on disk and
+    when it was last validated and used. Files the dashboard derives from
+    downloads (tar indexes, ingested Parquet, the combined data cache) are
+    recorded too. plant_traits/ is written by traits.py, not the dashboard,
+    and is not covered by the quota.
+    """
+
+    def __init__(self, manifest_path=MANIFEST_PATH, quota_bytes=DISK_QUOTA_BYTES):
+        self.manifest_path = manifest_path
+        self.quota_bytes = quota_bytes
+        self.lock = threading.Lock()
+        self.entries = {}
+        # bytes downloaded into memory (ranged reads) rather than to a file
+        self.transferred = 0
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, "r") as file:
+                    self.entries = json.load(file)
+            except ValueError as e:
+                print(e)
+                print("ignoring unreadable artifact manifest")
+
+    def save(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self.entries, file)
+        os.replace(tmp_path, self.manifest_path)
+
+    def lookup(self, key):
+        """Return (entry, fresh) for a usable artifact, or (None, False).
+
+        An artifact whose files were removed from disk is dropped from the
+        manifest. `fresh` is True while it was validated recently enough to
+        be used without asking the server.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None, False
+            if not all(os.path.exists(path) for path in entry["paths"]):
+                del self.entries[key]
+                self.save()
+                return None, False
+            entry["last_access"] = time.time()
+            fresh = time.time() - entry.get("validated", 0) < REVALIDATE_AFTER
+            return dict(entry), fresh
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def revalidated(self, key):
+        """Mark an artifact as confirmed unchanged by the server (HTTP 304)."""
+        with self.lock:
+            if key in self.entries:
+                self.entries[key]["validated"] = time.time()
+                self.entries[key]["last_access"] = time.time()
+                self.save()
+
+    def add_transferred(self, nbytes):
+        """Count bytes downloaded without being stored as they came.
+
+        Lets prefetch pacing see reads parsed in memory, whose results on
+        disk are much smaller than the traffic.
+        """
+        with self.lock:
+            self.transferred += nbytes
+
+    def forget(self, key):
+        """Drop an entry whose files the caller removed itself."""
+        with self.lock:
+            if self.entries.pop(key, None) is not None:
+                self.save()
+
+    def flush(self):
+        with self.lock:
+            self.save()
+
+    def record(self, key, remote, result, paths, headers=None, save=True):
+        """Add or replace an artifact and evict old ones past the quota.
+
+        Args:
+          - key (string): local path the artifact was requested as
+          - remote (string): remote path or url it came from
+          - result (string): path handed back to callers
+          - paths (list): files or folders it occupies on disk
+          - headers (dict): response headers with the validators
+          - save (bool): write the manifest now, else on the next flush
+        """
+        headers = headers or {}
+        now = time.time()
+        with self.lock:
+            self.entries[key] = {
+                "remote": remote,
+                "result": result,
+                "paths": list(paths),
+                "size": sum(disk_size(path) for path in paths),
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "validated": now,
+                "last_access": now,
+            }
+            self.evict(keep=key)
+            if save:
+                self.save()
+
+    def total_size(self):
+        return sum(entry["size"] for entry in self.entries.values())
+
+    def evict(self, keep=None):
+        # caller holds the lock
+        total = self.total_size()
+        for key in sorted(self.entries, key=lambda k: self.entries[k]["last_access"]):
+            if total <= self.quota_bytes:
+                break
+            if key == keep:
+                continue
+            entry = self.entries.pop(key)
+            for path in entry["paths"]:
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                elif os.path.exists(path):
+                    os.remove(path)
+            total -= entry["size"]
+            print("evicted", key)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "artifacts": len(self.entries),
+                "bytes": self.total_size(),
+                "quota_bytes": self.quota_bytes,
+                "transferred_bytes": self.transferred,
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide artifact store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ArtifactStore()
+    return _store
@@ -0,0 +1,175 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+import threading
+import time
+from urllib.parse import unquote
+
+CATALOG_PATH = "cyverse_catalog.sqlite"
+# folders below each index.json path that are crawled
+MAX_DEPTH = 3
+# seconds between two background refreshes
+REFRESH_INTERVAL = 900
+# a folder whose mtime did not change is still re-listed after this long, as
+# WebDAV folder mtimes only move when a direct child changes
+FULL_REFRESH_AFTER = 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    modified TEXT,
+    listed_at REAL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    parent TEXT NOT NULL,
+    name TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    modified TEXT,
+    size INTEGER,
+    PRIMARY KEY (parent, name)
+);
+"""
+
+
+def normalize(path):
+    while "//" in path:
+        path = path.replace("//", "/")
+    return path.rstrip("/") or "/"
+
+
+def index_roots(index):
+    """Every folder index.json points at, for all seasons."""
+    roots = set()
+    for season in index.values():
+        for levels in season["paths"].values():
+            for sensors in levels.values():
+                roots.update(sensors.values())
+        metadata = season["metadata"]
+        for sensors in metadata.get("plant-detect", {}).values():
+            roots.update(sensors.values())
+        roots.update(metadata.get("volume-entropy", {}).values())
+    # paths with an extension are files, not folders
+    return sorted(
+        normalize(root)
+        for root in roots
+        if root and "." not in os.path.basename(root)
+    )
+
+
+class Catalog:
+    """Local SQLite copy of the CyVerse folders the dashboard reads.
+
+    `children` answers like webdav3's Client.list (folder names end with a
+    slash) from an indexed query. `refresh` re-lists only folders that are
+    new, whose modification time changed, or that were not listed for
+    FULL_REFRESH_AFTER seconds.
+    """
+
+    def __init__(self, db_path=CATALOG_PATH):
+        self.db_path = db_path
+        self.refresh_lock = threading.Lock()
+        with self.connect() as db:
+            db.executescript(SCHEMA)
+        self.stats = {"listed": 0, "skipped": 0, "last_refresh": None}
+
+    @contextmanager
+    def connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+    def children(self, path):
+        """Listing of a catalogued folder, or None if it was never listed."""
+        path = normalize(path)
+        with self.connect() as db:
+            listed = db.execute("SELECT 1 FROM dirs WHERE path = ?", (path,))
+            if listed.fetchone() is None:
+                return None
+            rows = db.execute(
+                "SELECT name, is_dir FROM entries WHERE parent = ? ORDER BY name",
+                (path,),
+            ).fetchall()
+        return [f"{name}/" if is_dir else name for name, is_dir in rows]
+
+    def store_listing(self, db, path, modified, infos):
+        entries = []
+        for info in infos:
+            info_path = normalize(unquote(info["path"]))
+            # some servers list the folder itself too
+            if info_path.endswith(path):
+                continue
+            name = os.path.basename(info_path)
+            is_dir = bool(info.get("isdir"))
+            size = int(info["size"]) if info.get("size") else None
+            entries.append((path, name, int(is_dir), info.get("modified"), size))
+        db.execute("DELETE FROM entries WHERE parent = ?", (path,))
+        db.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", entries)
+        db.execute(
+            "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)", (path, modified, time.time())
+        )
+        return entries
+
+    def needs_listing(self, db, path, modified):
+        row = db.execute(
+            "SELECT modified, listed_at FROM dirs WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None or modified is None or row[0] != modified:
+            return True
+        return time.time() - row[1] > FULL_REFRESH_AFTER
+
+    def refresh(self, client, roots, max_depth=MAX_DEPTH):
+        """Crawl `roots`, re-listing only folders that may have changed."""
+        if not self.refresh_lock.acquire(blocking=False):
+            return
+        try:
+            with self.connect() as db:
+                # (path, modified as seen in the parent listing, depth)
+                pending = [(normalize(root), None, 0) for root in roots]
+                while pending:
+                    path, modified, depth = pending.pop()
+                    if depth > 0 and not self.needs_listing(db, path, modified):
+                        self.stats["skipped"] += 1
+                        rows = db.execute(
+                            "SELECT name, modified FROM entries"
+                            " WHERE parent = ? AND is_dir = 1",
+                            (path,),
+                        ).fetchall()
+                    else:
+                        try:
+                            infos = client.list(path, get_info=True)
+                        except Exception as e:
+                            print(e)
+                            print("could not list", path)
+                            continue
+                        self.stats["listed"] += 1
+                        entries = self.store_listing(db, path, modified, infos)
+                        db.commit()
+                        rows = [(e[1], e[3]) for e in entries if e[2]]
+                    if depth < max_depth:
+                        pending.extend(
+                            (f"{path}/{name}", child_modified, depth + 1)
+                            for name, child_modified in rows
+                        )
+            self.stats["last_refresh"] = time.time()
+        finally:
+            self.refresh_lock.release()
+
+    def start_background_refresh(self, client, roots, interval=REFRESH_INTERVAL):
+        """Refresh in a daemon thread now and every `interval` seconds."""
+
+        def run():
+            while True:
+                try:
+                    self.refresh(client, roots)
+                except Exception as e:
+                    print(e)
+                    print("catalog refresh failed")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name="catalog-refresh", daemon=True)
+        thread.start()
+        return thread
@@ -1,21 +1,46 @@
 from webdav3.client import Client
-from datetime import datetime, timedelta
 from st_aggrid import AgGrid, GridOptionsBuilder
 import pandas as pd
 import streamlit as st
 import plotly.express as px
-import open3d as o3d
-import requests
 import re
 import os
-import tarfile
-import glob
 import shutil  # remove filled directory to manage space
 import json
 import fetch_ipc as fipc
-import streamlit.components.v1 as components
-import numpy as np
+import artifacts
+import catalog
+import date_alignment
+import ingest
+import listing
+import plot_keys
+import ply_io
+import prefetch
+import spatial_join
+import transport
 import traceback
+import functools
+import hashlib
+import openpyxl
+import threading
+import uuid
+from collections import OrderedDict
+
+# most points sent to the browser for a plant unless the user asks for more
+POINT_BUDGET = 20000
+# most points drawn for each date of a growth time series
+TIMESERIES_POINT_BUDGET = 4000
+# decimated per-date clouds kept in memory for time series
+TIMESERIES_CACHE_SIZE = 2048
+# bytes held in memory at a time while streaming a download to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# local parquet copies of the combined data, bump the version to invalidate
+COMBINED_CACHE_DIR = "combined_cache"
+COMBINED_CACHE_VERSION = 4
+# member listings of remote tars read by ranges, kept to skip the header scan
+TAR_MEMBER_INDEX_DIR = "tar_member_index"
+WEBDAV_HOSTNAME = "https://data.cyverse.org/dav"
+WEBDAV_AUTH = ("phytooracle", "mac_scanalyzer")
 
 
 @st.cache_data
@@ -31,7 +56,7 @@ def get_date_list(
         return {}
     else:
         try:
-            subfolderlist = _session.list(path)
+            subfolderlist = listing.list_dir(_session, path)
             date_pattern = r"\d{4}-\d{2}-\d{2}"
             date_substrings = {}
             for string in subfolderlist:
@@ -65,6 +90,19 @@ def display_processing_info(_session, index, sensors, season, crop):
     all_avbl_lvls = sorted(
         list(index[season.split(" ")[1]]["paths"].keys()), reverse=True
     )
+    # list every sensor folder of every level at once, get_date_list then
+    # answers from the listing cache
+    listing.list_many(
+        _session,
+        [
+            path
+            for level in all_avbl_lvls
+            for path in index[season.split(" ")[1]]["paths"][level]
+            .get(crop, {})
+            .values()
+            if "." not in path
+        ],
+    )
     processed_files_ct_all = 0
     total_files_ct_all = 0
     for level in all_avbl_lvls[0:-1]:
@@ -152,64 +190,100 @@ def display_processing_info(_session, index, sensors, season, crop):
     info_sec.divider()
 
 
-@st.cache_data
 def download_file(remote_path, local_folder, local_name):
+    """Stream a file to disk in chunks, with bounded memory.
+
+    Downloads are tracked by the artifact store, so a copy on disk is reused
+    after a conditional GET (or without one when validated recently). Not
+    memoized, so files the store evicted are fetched again.
+    """
     options = {
-        "webdav_hostname": "https://data.cyverse.org/dav",
-        "webdav_login": "phytooracle",
-        "webdav_password": "mac_scanalyzer",
+        "webdav_hostname": WEBDAV_HOSTNAME,
+        "webdav_login": WEBDAV_AUTH[0],
+        "webdav_password": WEBDAV_AUTH[1],
         "webdav_root": "/",
     }
     if not os.path.exists(local_folder):
         os.makedirs(local_folder)
+    # specifically done this for the point clouds index
     try:
+        file_extn = remote_path.split(".")[1]
+    except:
+        file_extn = "txt"
+    store = artifacts.get_store()
+    key = f"{local_folder}/{local_name}.{file_extn}"
+    url = f'{options["webdav_hostname"]}{remote_path}'
+    auth = (options["webdav_login"], options["webdav_password"])
+
+    def fetch():
         # using requests module as webdav3 causing problems while downloading files
-        response = requests.get(
-            f'{options["webdav_hostname"]}{remote_path}',
-            auth=(options["webdav_login"], options["webdav_password"]),
+        response = transport.get_session().get(
+            url,
+            auth=auth,
+            headers=store.conditional_headers(entry),
+            stream=True,
         )
-        # specifically done this for the point clouds index
+        with response:
+            if response.status_code == 304:
+                store.revalidated(key)
+                return entry["result"]
+            if response.status_code != 200:
+                print(f"HTTP {response.status_code} for {remote_path}")
+                return ""
+            # Save the content to a local file, readers of `key` (e.g. an
+            # os.path.exists check) only ever see a complete one
+            tmp_path = f"{key}.tmp"
+            with open(tmp_path, "wb") as local_file:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    local_file.write(chunk)
+            os.replace(tmp_path, key)
+            store.record(key, remote_path, key, [key], response.headers)
+            return key
+
+    # one thread (the script or a prefetch worker) downloads a file at a
+    # time, the others wait for it and reuse its copy
+    with ingest.ingest_lock(key):
+        entry, fresh = store.lookup(key)
+        if entry is not None and fresh:
+            return entry["result"]
         try:
-            file_extn = remote_path.split(".")[1]
-        except:
-            file_extn = "txt"
-        if response.status_code == 200:
-            # Save the content to a local file
-            with open(f"{local_folder}/{local_name}.{file_extn}", "wb") as local_file:
-                local_file.write(response.content)
-            if file_extn == "tar" or file_extn == "gz":
-                with tarfile.open(
-                    f"{local_folder}/{local_name}.{file_extn}", "r"
-                ) as tar:
-                    tar.extractall(path=local_folder)
-                    extracted_items = tar.getnames()
-                    os.remove(f"{local_folder}/{local_name}.{file_extn}")
-                    return f"{local_folder}/{extracted_items[1]}"
-            return f"{local_folder}/{local_name}.{file_extn}"
-    except Exception as e:
-        print(traceback.format_exc())
-        return ""
+            # the session retries failed requests, this retries transfers that
+            # stall or break after the response started
+            return transport.retry_call(fetch, retries=2)
+        except Exception as e:
+            print(traceback.format_exc())
+            return ""
 
 
-@st.cache_data
 def get_plant_detection_csv(_session, index, season, sensor, crop, date):
     if re.search("3d", sensor, re.IGNORECASE):
         # 3D sensors don't have Plant Detection CSVs, so we find approx RGB date
-        date_RGB = get_closest_date(
-            _session, index, season, "stereoTop", crop, "0", date
-        )[0]
-        if not date_RGB:
+        closest_date = get_closest_date(
+            _session, index, season, "stereoTop", crop, "0", date, (sensor, "0")
+        )
+        if not closest_date:
             st.write(
                 f"No Plant Detection CSV is present for this sensor on this date. ({date})"
             )
             return ""
-        date = date_RGB
+        date = closest_date[0]
         sensor = "stereoTop"
+    return fetch_plant_detection_csv(_session, index, season, sensor, crop, date)
+
+
+def fetch_plant_detection_csv(_session, index, season, sensor, crop, date):
+    """Download the Plant Detection CSV of a sensor with its own detections.
+
+    Shows nothing, so prefetch workers can call it too.
+
+    Returns:
+      - local path of the csv, or "" when there is none for the date
+    """
     plant_detection_folder_p = index[season.split(" ")[1]]["metadata"]["plant-detect"][
         crop
     ][sensor]
     # sublist = _session.list(plant_detection_folder_p, get_info=True)
-    sublist = _session.list(plant_detection_folder_p)
+    sublist = listing.list_dir(_session, plant_detection_folder_p)
     date_pattern = r"\d{4}-\d{2}-\d{2}"
     for name in sublist:
         potential_date = re.search(date_pattern, name)
@@ -219,7 +293,7 @@ def get_plant_detection_csv(_session, index, season, sensor, crop, date):
                 path_set = False
                 # is a dir.
                 if "/" in name:
-                    item_list = _session.list(path)
+                    item_list = listing.list_dir(_session, path)
                     for item in item_list:
                         if sensor != "ps2Top":
                             if "detect_out" in item:
@@ -249,25 +323,59 @@ def get_plant_detection_csv(_session, index, season, sensor, crop, date):
     return ""
 
 
-def get_closest_date(_session, index, season, sensor, crop, level, date):
-    dates = get_date_list(_session, index, season, sensor, crop, level)
-    closest_date = []
-    date_3D_obj = datetime.strptime(date, "%Y-%m-%d")
-    # to check neighboring dates in case of no exact match
-    for date_id in dates.keys():
-        dte_obj = datetime.strptime(date_id, "%Y-%m-%d")
-        if (date_3D_obj == dte_obj) or (
-            date_3D_obj == dte_obj + timedelta(days=2)
-            or date_3D_obj == dte_obj - timedelta(days=2)
-        ):
-            closest_date = [date_id, dates[date_id]]
-        if (date_3D_obj == dte_obj):
-            break
-    print(closest_date)
-    return closest_date
+@st.cache_resource
+def build_date_alignment(date_lists):
+    # keyed on the date lists themselves, so it is only rebuilt when they change
+    return date_alignment.DateAlignment(date_lists)
+
+
+def get_date_alignment(_session, index, season, crop):
+    """Date alignment table of every sensor and level of a season and crop."""
+    season_paths = index[season.split(" ")[1]]["paths"]
+    keys = {
+        (sensor, level): path
+        for level, crops in season_paths.items()
+        for sensor, path in crops.get(crop, {}).items()
+        # files (e.g. *.tar.gz, *.csv) have no dates to list
+        if "." not in path
+    }
+    listings = listing.list_many(_session, keys.values())
+    date_lists = {
+        (sensor, level): get_date_list(_session, index, season, sensor, crop, level)
+        for (sensor, level), path in keys.items()
+        if path in listings
+    }
+    return build_date_alignment(date_lists)
+
+
+def get_closest_date(
+    _session,
+    index,
+    season,
+    sensor,
+    crop,
+    level,
+    date,
+    source=None,
+    tolerance=date_alignment.DATE_TOLERANCE_DAYS,
+):
+    """Nearest date of a sensor and level to `date`.
+
+    Args:
+      - source (tuple): (sensor, level) the date was picked from, if known
+      - tolerance (int): most days between the two dates
+
+    Returns:
+      - [date, folder name], or [] when no date is within tolerance
+    """
+    alignment = get_date_alignment(_session, index, season, crop)
+    match = alignment.nearest(date, (sensor, level), source, tolerance)
+    print(match)
+    if match is None:
+        return []
+    return [match[0], match[1]]
 
 
-@st.cache_data
 def download_fieldbook(index, season):
     try:
         file_loc = index[season.split(" ")[1]]["metadata"]["fieldbook"]
@@ -281,44 +389,58 @@ def download_fieldbook(index, season):
         return ""
 
 
-def data_analysis(
-    _session,
-    index,
-    season,
-    crop,
-    sensor,
-    date,
-    field_book_name,
-    plant_detect_name,
-):
-    # make field book dataframe based on its extension
-    if field_book_name.split(".")[1] == "xlsx":
-        try:
-            all_sheets = pd.read_excel(
-                io=field_book_name,
-                sheet_name=None,
-                engine="openpyxl",
-            )
+def read_fieldbook_sheet(field_book_name):
+    """Read the "field book" sheet of a workbook in streaming read-only mode."""
+    workbook = openpyxl.load_workbook(field_book_name, read_only=True, data_only=True)
+    try:
+        # Use the first sheet that satisfies the condition
+        sheet = [
+            name
+            for name in workbook.sheetnames
+            if "field" in name.lower() and "book" in name.lower()
+        ][0]
+        rows = workbook[sheet].iter_rows(values_only=True)
+        # name blank header cells the way pandas does
+        header = [
+            name if name is not None else f"Unnamed: {i}"
+            for i, name in enumerate(next(rows))
+        ]
+        return pd.DataFrame(
+            [row for row in rows if any(value is not None for value in row)],
+            columns=header,
+        )
+    finally:
+        workbook.close()
 
-            # Filter sheets based on condition
-            filtered_sheets = [
-                sheet
-                for sheet in all_sheets.keys()
-                if "field" in sheet.lower() and "book" in sheet.lower()
-            ]
 
-            # Read the desired sheet
-            field_book_df = pd.read_excel(
-                io=field_book_name,
-                sheet_name=filtered_sheets[
-                    0
-                ],  # Use the first sheet that satisfies the condition
-                engine="openpyxl",
-            )
+def load_fieldbook(field_book_name):
+    """Fieldbook with a normalized plot column, from a one-time Parquet copy.
+
+    The xlsx/csv fieldbook is parsed once per season and stored next to it as
+    Parquet, tracked by the artifact store. Later loads read that copy while
+    it is newer than the source.
 
+    Returns:
+      - fieldbook dataframe, or None if the file can't be read
+    """
+    columnar_name = f"{os.path.splitext(field_book_name)[0]}.parquet"
+    if os.path.exists(columnar_name) and os.path.getmtime(
+        columnar_name
+    ) >= os.path.getmtime(field_book_name):
+        try:
+            field_book_df = pd.read_parquet(columnar_name)
+            # counts as a use for the store's eviction order
+            artifacts.get_store().lookup(columnar_name)
+            return field_book_df
+        except Exception as e:
+            print(traceback.format_exc())
+    # make field book dataframe based on its extension
+    if field_book_name.split(".")[1] == "xlsx":
+        try:
+            field_book_df = read_fieldbook_sheet(field_book_name)
         except Exception as e:
             print(traceback.format_exc())
-            return
+            return None
     elif field_book_name.split(".")[1] == "csv":
         field_book_df = pd.read_csv(field_book_name)
     else:
@@ -326,95 +448,183 @@ def data_analysis(
             f"Can't deal with files with the extension {field_book_name.split('.')[1]}."
         )
         st.write("Please contact the Phytooracle staff")
-        return
+        return None
+    field_book_df = field_book_df.rename(columns={"Plot": "plot"})
+    field_book_df.columns = field_book_df.columns.map(str)
+    if "plot" in field_book_df.columns:
+        try:
+            field_book_df["plot"] = field_book_df["plot"].astype(int)
+        except (TypeError, ValueError):
+            pass
+    for column in field_book_df.select_dtypes("object").columns:
+        # parquet needs one type per column, keep mixed columns as text
+        if not field_book_df[column].map(type).isin([str, type(None)]).all():
+            field_book_df[column] = field_book_df[column].astype("string")
+    try:
+        tmp_name = f"{columnar_name}.tmp"
+        field_book_df.to_parquet(tmp_name, index=False)
+        os.replace(tmp_name, columnar_name)
+        artifacts.get_store().record(
+            columnar_name, field_book_name, columnar_name, [columnar_name]
+        )
+    except Exception as e:
+        print(traceback.format_exc())
+    return field_book_df
+
+
+def read_input_frames(season, sensor, field_book_name, plant_detect_name):
+    """Read the fieldbook and plant detection csv and normalize their plot keys.
+
+    Returns:
+      - (field_book_df, plant_detect_df), or None if the fieldbook can't be read
+    """
+    field_book_df = load_fieldbook(field_book_name)
+    if field_book_df is None:
+        return None
     plant_detect_df = pd.read_csv(plant_detect_name)
     plant_detect_df = plant_detect_df.rename(columns={"Plot": "plot"})
-    field_book_df = field_book_df.rename(columns={"Plot": "plot"})
     # to fix season 10 and 11
-    if season == "Season 10":
-
-        if sensor == "stereoTop" or sensor == "scanner3DTop":
-            plant_detect_df["plot"] = plant_detect_df["plot"].str.split(
-                "_", expand=True
-            )[6].str.zfill(2) + plant_detect_df["plot"].str.split("_", expand=True)[
-                8
-            ].str.zfill(
-                2
-            )
-            plant_detect_df["plot"] = plant_detect_df["plot"].astype(int)
-        elif sensor == "flirIrCamera":
-            plant_detect_df["plot"] = plant_detect_df["plot"].str.split(
-                "_", expand=True
-            )[6].str.zfill(2) + plant_detect_df["plot"].str.split("_", expand=True)[
-                8
-            ].str.zfill(
-                2
-            )
-        elif sensor == "ps2Top":
-            plant_detect_df["plot"] =plant_detect_df["Plot"].str.split(
-                " ", expand=True
-            )[6].str.zfill(2) + plant_detect_df["Plot"].str.split(" ", expand=True)[
-                8
-            ].str.zfill(
-                2
-            )
-    if season == " Season 11":
-        plant_detect_df["plot"] = plant_detect_df["plot"].astype(str).str.zfill(4)
+    plant_detect_df = plot_keys.normalize_plot(plant_detect_df, season, sensor)
+    if "plot" in plant_detect_df.columns:
+        unmatched = plant_detect_df["plot"].isna()
+        if unmatched.any():
+            print(f"Dropping {unmatched.sum()} detections without a plot key")
+            plant_detect_df = plant_detect_df[~unmatched]
+    return field_book_df, plant_detect_df
+
+
+def input_fingerprint(*paths):
+    """Hash of the name, size and modification time of every existing input.
+
+    Call it once the inputs are fetched, a file that isn't there yet is
+    left out of the hash.
+    """
+    digest = hashlib.sha1(str(COMBINED_CACHE_VERSION).encode())
+    for path in paths:
+        if path and os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+
+def combined_cache_dir(season, sensor, crop, date, fingerprint):
+    return os.path.join(
+        COMBINED_CACHE_DIR,
+        f"season_{season.split(' ')[1]}",
+        sensor,
+        crop,
+        f"{date}_{fingerprint}",
+    )
+
+
+def load_combined_cache(cache_dir):
+    """Load a cached combined data set.
+
+    Returns:
+      - (result, plant_detect_df, field_book_df, visualize), or None on a miss
+    """
+    if not os.path.exists(f"{cache_dir}/meta.json"):
+        return None
+    try:
+        with open(f"{cache_dir}/meta.json", "r") as file:
+            meta = json.load(file)
+        return (
+            pd.read_parquet(f"{cache_dir}/result.parquet"),
+            pd.read_parquet(f"{cache_dir}/plant_detect.parquet"),
+            pd.read_parquet(f"{cache_dir}/field_book.parquet"),
+            meta["visualize"],
+        )
+    except Exception as e:
+        print(traceback.format_exc())
+        return None
+
+
+def save_combined_cache(cache_dir, result, plant_detect_df, field_book_df, visualize):
+    """Persist a combined data set, replacing older versions of the same date."""
+    parent, name = os.path.split(cache_dir)
+    key = name.rsplit("_", 1)[0]
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        result.to_parquet(f"{cache_dir}/result.parquet", index=False)
+        plant_detect_df.to_parquet(f"{cache_dir}/plant_detect.parquet", index=False)
+        field_book_df.to_parquet(f"{cache_dir}/field_book.parquet", index=False)
+        # written last, a cache entry without meta.json is never read
+        with open(f"{cache_dir}/meta.json", "w") as file:
+            json.dump({"visualize": visualize}, file)
+    except Exception as e:
+        print(traceback.format_exc())
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        return
+    store = artifacts.get_store()
+    store.record(cache_dir, "combined data", cache_dir, [cache_dir])
+    for old in os.listdir(parent):
+        if old != name and old.rsplit("_", 1)[0] == key:
+            shutil.rmtree(os.path.join(parent, old), ignore_errors=True)
+            store.forget(os.path.join(parent, old))
+
+
+def data_analysis(
+    _session,
+    index,
+    season,
+    crop,
+    sensor,
+    date,
+    field_book_name,
+    plant_detect_name,
+):
+    extra_inputs = fetch_extra_inputs(_session, index, season, crop, sensor, date)
+    # a result built while an input was missing is shown but never cached
+    complete = "" not in extra_inputs.values()
+    fingerprint = input_fingerprint(
+        field_book_name, plant_detect_name, *extra_inputs.values()
+    )
+    cache_dir = combined_cache_dir(season, sensor, crop, date, fingerprint)
+    cached = load_combined_cache(cache_dir) if complete else None
+    if cached is not None:
+        print("Combined data loaded from cache")
+        show_combined_data(_session, index, season, crop, sensor, date, *cached)
+        return
+    frames = read_input_frames(season, sensor, field_book_name, plant_detect_name)
+    if frames is None:
+        return
+    field_book_df, plant_detect_df = frames
     try:
         plant_detect_df["plot"] = plant_detect_df["plot"].astype(int)
         field_book_df["plot"] = field_book_df["plot"].astype(int)
         result = plant_detect_df.merge(field_book_df, on="plot")
-        update = extra_files(_session, result, index, season, crop, sensor, date)
-        if not re.search("ps2", sensor, re.IGNORECASE) and not update.empty:
+        update = extra_files(result, sensor, extra_inputs)
+        visualize = not re.search("ps2", sensor, re.IGNORECASE) and not update.empty
+        if not update.empty:
             result = update
-            # To drop duplicate genotype columns
-            result = result.drop("genotype_y", axis=1, errors="ignore")
-            result = result.rename(columns={"genotype_x": "genotype"}, errors="ignore")
-            # to drop min/max_x/y/z
-            result.drop(list(result.filter(regex="min_?|max_?")), axis=1, inplace=True)
-            # to drop empty index col
-            result.drop(
-                result.columns[result.columns.str.contains("unnamed", case=False)],
-                axis=1,
-                inplace=True,
-            )
-            file_fetcher = create_file_fetcher(_session, index, season, date, crop)
-            # maybe add try/except here
-            create_filter(file_fetcher, result)
-        else:
-            if not update.empty:
-                result = update
-            st.subheader(f"Visualizations are not available for {sensor} sensor")
-            st.write("Combined Data is available for download")
-            # To drop duplicate genotype columns
-            result = result.drop("genotype_y", axis=1, errors="ignore")
-            result = result.rename(columns={"genotype_x": "genotype"}, errors="ignore")
-            # to drop min/max_x/y/z
-            result.drop(list(result.filter(regex="min_?|max_?")), axis=1, inplace=True)
-            # to drop empty index col
-            result.drop(
-                result.columns[result.columns.str.contains("unnamed", case=False)],
-                axis=1,
-                inplace=True,
-            )
-            st.download_button(
-                label="Download Plant Detection CSV (Separately)",
-                data=convert_df(plant_detect_df),
-                file_name=f"{date}_plant_detect_out.csv",
-                mime="text/csv",
-            )
-            st.download_button(
-                label="Download Fieldbook Data (Separately)",
-                data=convert_df(field_book_df),
-                file_name=f"season_{season.split(' ')[1]}_fieldbook.csv",
-                mime="text/csv",
-            )
-            st.download_button(
-                label="Download Combined Data",
-                data=convert_df(result),
-                file_name=f"{date}_combined_data.csv",
-                mime="text/csv",
+        # To drop duplicate genotype columns
+        result = result.drop("genotype_y", axis=1, errors="ignore")
+        result = result.rename(columns={"genotype_x": "genotype"}, errors="ignore")
+        # to drop min/max_x/y/z
+        result.drop(list(result.filter(regex="min_?|max_?")), axis=1, inplace=True)
+        # to drop empty index col
+        result.drop(
+            result.columns[result.columns.str.contains("unnamed", case=False)],
+            axis=1,
+            inplace=True,
+        )
+        result = ingest.compact(result, f"{season} {sensor} {date}")
+        if complete:
+            save_combined_cache(
+                cache_dir, result, plant_detect_df, field_book_df, visualize
             )
+        show_combined_data(
+            _session,
+            index,
+            season,
+            crop,
+            sensor,
+            date,
+            result,
+            plant_detect_df,
+            field_book_df,
+            visualize,
+        )
     except Exception as e:
         # result dataframe is empty or has not been created, allow the users to download the plant detection csv and fieldbook csv
         print(traceback.format_exc())
@@ -436,82 +646,153 @@ def data_analysis(
         )
 
 
-def extra_files(_session, combined_df, index, season, crop, sensor, date):
-    combined_df[["lat", "lon"]] = (
-        combined_df[["lat", "lon"]].apply(pd.to_numeric).apply(lambda x: round(x, 7))
-    )
+def show_combined_data(
+    _session,
+    index,
+    season,
+    crop,
+    sensor,
+    date,
+    result,
+    plant_detect_df,
+    field_book_df,
+    visualize,
+):
+    if visualize:
+        file_fetcher = create_file_fetcher(
+            _session, index, season, date, crop, sensor
+        )
+        # maybe add try/except here
+        # the season index is only built if the user asks for a time series
+        load_season_index = functools.partial(
+            get_season_index, _session, index, season, crop
+        )
+        create_filter(file_fetcher, result, load_season_index)
+    else:
+        st.subheader(f"Visualizations are not available for {sensor} sensor")
+        st.write("Combined Data is available for download")
+        st.download_button(
+            label="Download Plant Detection CSV (Separately)",
+            data=convert_df(plant_detect_df),
+            file_name=f"{date}_plant_detect_out.csv",
+            mime="text/csv",
+        )
+        st.download_button(
+            label="Download Fieldbook Data (Separately)",
+            data=convert_df(field_book_df),
+            file_name=f"season_{season.split(' ')[1]}_fieldbook.csv",
+            mime="text/csv",
+        )
+        st.download_button(
+            label="Download Combined Data",
+            data=convert_df(result),
+            file_name=f"{date}_combined_data.csv",
+            mime="text/csv",
+        )
+
+
+def fetch_extra_inputs(_session, index, season, crop, sensor, date):
+    """Fetch the files extra_files merges into the combined data of a sensor.
+
+    Returns:
+      - dict of input name -> local path, "" for an input that could not be
+        fetched and None for an optional one that doesn't exist
+    """
     if "3D" in sensor:
-        download_loc = dload_indv_plant_data_3D(_session, index, season, crop, date)
-        if download_loc != "":
-            plant_data_path = combine_csv_into_one(
-                download_loc, f"{crop}_{date}_{season.split(' ')[1]}"
-            )
-            plant_clustering_path = download_plant_clustering_csv(
-                index, season, "stereoTop"
+        traits_path = f"plant_traits/{crop}_{date}_{season.split(' ')[1]}.parquet"
+        return {
+            "plant_data": load_indv_plant_data_3D(_session, index, season, crop, date),
+            "clustering": download_plant_clustering_csv(index, season, "stereoTop"),
+            # geometric traits written by traits.py for this date, if any
+            "traits": traits_path if os.path.exists(traits_path) else None,
+        }
+    if re.search("ps2", sensor, re.IGNORECASE):
+        return {"clustering": download_plant_clustering_csv(index, season, "stereoTop")}
+    return {"clustering": download_plant_clustering_csv(index, season, sensor)}
+
+
+def extra_files(combined_df, sensor, inputs):
+    """Merge the inputs of fetch_extra_inputs into the combined data.
+
+    Returns:
+      - the merged data, or an empty frame when an input is missing
+    """
+    combined_df[["lat", "lon"]] = combined_df[["lat", "lon"]].apply(pd.to_numeric)
+    if "" in inputs.values():
+        return pd.DataFrame()
+    if "3D" in sensor:
+        plant_clustering_df = pd.read_csv(inputs["clustering"]).loc[
+            :, ["plant_name", "lat", "lon"]
+        ]
+        ind_plant_df = pd.read_parquet(inputs["plant_data"])
+        ind_plant_df = ind_plant_df.merge(plant_clustering_df, on="plant_name")
+        if inputs["traits"]:
+            ind_plant_df = ind_plant_df.merge(
+                pd.read_parquet(inputs["traits"]), on="plant_name", how="left"
             )
-            if plant_clustering_path != "":
-                plant_clustering_df = pd.read_csv(plant_clustering_path).loc[
-                    :, ["plant_name", "lat", "lon"]
-                ]
-                plant_clustering_df[["lat", "lon"]] = (
-                    plant_clustering_df[["lat", "lon"]]
-                    .apply(pd.to_numeric)
-                    .apply(lambda x: round(x, 7))
-                )
-                ind_plant_df = pd.read_csv(plant_data_path)
-                # Taking very long time - 3 mins (try merging plant_clustering with ind first)
-                ind_plant_df = ind_plant_df.merge(plant_clustering_df, on="plant_name")
-                combined_df = combined_df.merge(ind_plant_df, on=["lat", "lon"])
-                return combined_df
+        return spatial_join.spatial_merge(combined_df, ind_plant_df)
+    if re.search("ps2", sensor, re.IGNORECASE):
+        try:
+            plant_clustering_df = pd.read_csv(inputs["clustering"]).loc[
+                :, ["plant_name", "plot", "genotype", "lat", "lon"]
+            ]
+            return combined_df.merge(plant_clustering_df, on=["plot", "genotype"])
+        except Exception as e:
+            print(traceback.format_exc())
+            return pd.DataFrame()
+    try:
+        plant_clustering_df = pd.read_csv(inputs["clustering"]).loc[
+            :,
+            ["plant_name", "lat", "lon"],
+        ]
+        return spatial_join.spatial_merge(combined_df, plant_clustering_df)
+    except:
+        print(traceback.format_exc())
         return pd.DataFrame()
-    else:
-        if re.search("ps2", sensor, re.IGNORECASE):
-            path = download_plant_clustering_csv(index, season, "stereoTop")
-            if path != "":
-                try:
-                    plant_clustering_df = pd.read_csv(path).loc[
-                        :, ["plant_name", "plot", "genotype", "lat", "lon"]
-                    ]
-                    plant_clustering_df[["lat", "lon"]] = (
-                        plant_clustering_df[["lat", "lon"]]
-                        .apply(pd.to_numeric)
-                        .apply(lambda x: round(x, 7))
-                    )
-                    combined_df = combined_df.merge(
-                        plant_clustering_df, on=["plot", "genotype"]
-                    )
-                    return combined_df
-                except Exception as e:
-                    print(traceback.format_exc())
-                    return pd.DataFrame()
-        else:
-            path = download_plant_clustering_csv(index, season, sensor)
-            if path != "":
-                try:
-                    plant_clustering_df = pd.read_csv(path).loc[
-                        :,
-                        ["plant_name", "lat", "lon"],
-                    ]
-                    plant_clustering_df[["lat", "lon"]] = (
-                        plant_clustering_df[["lat", "lon"]]
-                        .apply(pd.to_numeric)
-                        .apply(lambda x: round(x, 7))
-                    )
-                    combined_df = combined_df.merge(
-                        plant_clustering_df, on=["lat", "lon"]
-                    )
-                    return combined_df
-                except:
-                    print(traceback.format_exc())
-                    return pd.DataFrame()
-    return pd.DataFrame()
 
 
-def dload_indv_plant_data_3D(_session, index, season, crop, date):
+def load_indv_plant_data_3D(_session, index, season, crop, date):
+    """ingest_indv_plant_data_3D, telling the user when there is no data.
+
+    Returns:
+      - path of the Parquet file, or "" when there is no data for the date
+    """
     try:
+        out_path = ingest_indv_plant_data_3D(_session, index, season, crop, date)
+        if out_path == "":
+            st.write(f"Couldn't find the necessary file for plant vis. for this date")
+        return out_path
+    except Exception as e:
+        print(traceback.format_exc())
+        st.write(
+            f"Problem occurered while downloading necessary files for 3D sensor. Contact Phytooracle Staff"
+        )
+        return ""
+
+
+def ingest_indv_plant_data_3D(_session, index, season, crop, date):
+    """Ingest the per-plant csvs of a volumes_entropy tar into a Parquet file.
+
+    The member headers of the remote tar are listed with ranged reads (and
+    cached in TAR_MEMBER_INDEX_DIR), then only the csv members are fetched
+    and streamed into the Parquet file a bounded batch at a time. Nothing
+    is extracted to disk. Only the plant csvs in the archive's top folder
+    are read, as when the tar was extracted and `<folder>/*.csv` combined. A
+    date being ingested by another thread (e.g. the prefetcher) is waited
+    for, not fetched twice. Shows nothing, so prefetch workers can call it
+    too.
+
+    Returns:
+      - path of the Parquet file, or "" when there is no data for the date
+    """
+    csv_name = f"{crop}_{date}_{season.split(' ')[1]}"
+    out_path = f"indv_plant_data/{csv_name}.parquet"
+    with ingest.ingest_lock(out_path):
+        if os.path.exists(out_path):
+            return out_path
         path = index[season.split(" ")[1]]["metadata"]["volume-entropy"][crop]
         print(path)
-        sublist = _session.list(path)
+        sublist = listing.list_dir(_session, path)
         date_found = False
         for file in sublist:
             if date in file:
@@ -519,47 +800,41 @@ def dload_indv_plant_data_3D(_session, index, season, crop, date):
                 date_found = True
                 break
         if date_found:
-            sublist = _session.list(path)
+            sublist = listing.list_dir(_session, path)
             for file in sublist:
                 if re.search("volumes_entropy", file, re.IGNORECASE):
-                    path = download_file(
-                        f"{path}/{file}",
-                        "indv_plant_data",
-                        f"{crop}_{date}_{season.split(' ')[1]}",
+                    url = f"{WEBDAV_HOSTNAME}{path}/{file}"
+                    members = fipc.load_or_scan_members(
+                        url,
+                        f"{TAR_MEMBER_INDEX_DIR}/{csv_name}_volumes_entropy.json",
+                        ".csv",
+                        WEBDAV_AUTH,
                     )
-                    path = path.split("/")[0:-1]
-                    path = "/".join(path)
-                    return path
-        st.write(f"Couldn't find the necessary file for plant vis. for this date")
-        return ""
-    except Exception as e:
-        print(traceback.format_exc())
-        st.write(
-            f"Problem occurered while downloading necessary files for 3D sensor. Contact Phytooracle Staff"
-        )
-        return ""
-
-
-def combine_csv_into_one(folder, csv_name):
-    if os.path.exists(f"indv_plant_data/{csv_name}.csv"):
-        return f"indv_plant_data/{csv_name}.csv"
-    try:
-        all_files = glob.glob(folder + "/*.csv")
-        li = []
-        for filename in all_files:
-            # to avoid other date csv
-            pattern = r"\w+_\d{4}-\d{2}-\d{2}_\d{2}.csv"
-            if not re.match(pattern, filename):
-                df = pd.read_csv(filename, index_col=None, header=0)
-                li.append(df)
-        if li != []:
-            result_frame = pd.concat(li, axis=0, ignore_index=True)
-            result_frame.to_csv(f"indv_plant_data/{csv_name}.csv", index=False)
-            shutil.rmtree(folder)
-            return f"indv_plant_data/{csv_name}.csv"
-        return ""
-    except:
-        print(traceback.format_exc())
+                    if not members:
+                        return ""
+                    name = os.path.normpath(members[0][2])
+                    folder = name.split("/")[0] if "/" in name else ""
+                    # to avoid other date csv
+                    pattern = r"\w+_\d{4}-\d{2}-\d{2}_\d{2}.csv"
+                    entries = [
+                        {"block": block, "file_size": file_size, "path": name}
+                        for block, file_size, name in members
+                        if os.path.dirname(os.path.normpath(name)) == folder
+                        and not re.match(pattern, os.path.basename(name))
+                    ]
+                    # spans arrive in archive order, plants are sorted by
+                    # name there, and are written as they come
+                    batches = fipc.iter_member_batches(
+                        url, entries, auth=WEBDAV_AUTH, strict=True
+                    )
+                    out_path = ingest.combine_csv_stream(
+                        (data for batch in batches for _, data in batch), out_path
+                    )
+                    if out_path != "":
+                        artifacts.get_store().record(
+                            out_path, url, out_path, [out_path]
+                        )
+                    return out_path
         return ""
 
 
@@ -584,42 +859,87 @@ def convert_df(df):
     return df.to_csv(index=False).encode("utf-8")
 
 
-def create_file_fetcher(_session, index, season, date, crop):
+def make_fetcher(index, season, crop, date_folder):
+    """Fetcher for one level 2 scanner3DTop date folder."""
+    level_2_path = index[season.split(" ")[1]]["paths"]["2"][crop]["scanner3DTop"]
+    cyverse_path = f"{level_2_path}/{date_folder}/individual_plants_out/{date_folder}_segmentation_pointclouds_index"
+    local_idx_path = download_file(
+        cyverse_path,
+        "visualization",
+        f"{date_folder}_segmentation_pointclouds_index",
+    )
+    if local_idx_path == "":
+        # no index next to the tar, the Fetcher builds one from the tar headers
+        local_idx_path = f"visualization/{date_folder}_segmentation_pointclouds_index.txt"
+    return fipc.Fetcher(
+        "individually_called_point_clouds",
+        season,
+        "level_2",
+        date_folder,
+        crop,
+        local_idx_path,
+    )
+
+
+def create_file_fetcher(_session, index, season, date, crop, sensor=None):
     closest_date = get_closest_date(
-        _session, index, season, "scanner3DTop", crop, "2", date
-    )[1]
-    if closest_date is None:
+        _session,
+        index,
+        season,
+        "scanner3DTop",
+        crop,
+        "2",
+        date,
+        (sensor, "0") if sensor else None,
+    )
+    if not closest_date:
         # There are no level 2 point clouds for the chosen date or any date near it
         file_fetcher = None
     else:
         try:
-            level_2_path = index[season.split(" ")[1]]["paths"]["2"][crop]
-            cyverse_path = f"{level_2_path}/{closest_date}/individual_plants_out/{closest_date}_segmentation_pointclouds_index"
-            local_idx_path = download_file(
-                cyverse_path,
-                "visualization",
-                f"{closest_date}_segmentation_pointclouds_index",
-            )
-            file_fetcher = fipc.Fetcher(
-                "individually_called_point_clouds",
-                season,
-                "level_2",
-                closest_date,
-                crop,
-                local_idx_path,
-            )
+            file_fetcher = make_fetcher(index, season, crop, closest_date[1])
         except:
             print(traceback.format_exc())
             return None
     return file_fetcher
 
 
-def create_filter(file_fetcher, combined_data):
+@st.cache_resource(ttl=3600)
+def get_season_index(_session, index, season, crop):
+    """Season-wide plant -> (date, tar offset) index for the level 2 point clouds.
+
+    Only dates missing from the saved index are indexed, so new scan dates
+    are picked up incrementally.
+    """
+    base = f"visualization/season_{season.split(' ')[1]}_{crop}_season_index"
+    season_index = fipc.SeasonIndex.load(base)
+    dates = get_date_list(_session, index, season, "scanner3DTop", crop, "2")
+    added = False
+    for date_folder in dates.values():
+        if date_folder in season_index.dates:
+            continue
+        try:
+            file_fetcher = make_fetcher(index, season, crop, date_folder)
+        except:
+            print(traceback.format_exc())
+            continue
+        if len(file_fetcher.index_date):
+            season_index = season_index.add_date(date_folder, file_fetcher.index_date)
+            added = True
+    if added:
+        os.makedirs("visualization", exist_ok=True)
+        season_index.save(base)
+        paths = [f"{base}.npy", f"{base}.json"]
+        artifacts.get_store().record(paths[0], "season index", paths[0], paths)
+    return season_index
+
+
+def create_filter(file_fetcher, combined_data, load_season_index=None):
     """Creates a dynamic fiter
 
     Args:
       - combined_data (pandas df): Everything in this dataframe
-      - sensor (string): selected sensor
+      - load_season_index (callable): returns the SeasonIndex for time series
     """
     filter_options = []
     pn_exists = False
@@ -705,7 +1025,11 @@ def create_filter(file_fetcher, combined_data):
 
         # vizualization on point clouds is possible and a plant was selected use callback
         if selected["selected_rows"] and file_fetcher:
-            callback(file_fetcher, selected["selected_rows"][0]["plant_name"])
+            callback(
+                file_fetcher,
+                selected["selected_rows"][0]["plant_name"],
+                load_season_index,
+            )
 
     col1.download_button(
         label="Download All Data",
@@ -769,29 +1093,152 @@ def get_visuals(file_fetcher, filtered_df, column_name, pn_exists):
     plotly_col.plotly_chart(fig, use_container_width=True)
 
 
-def callback(file_fetcher, crop_name):
-    """
-    Callback function to download 3D data of a plant, read a point cloud file, apply an offset to the x and y coordinates,
-    create a DataFrame from the point cloud data, and generate a 3D scatter plot of the point cloud using Plotly.
+def plant_lod_pyramid(file_fetcher, plant_name):
+    """Voxel level-of-detail pyramid of a plant's final point cloud."""
+    points = file_fetcher.fetch_plant_points(plant_name)
+    if points is None:
+        return None
+    # Apply offset after opening the point cloud
+    x_offset = 409000
+    y_offset = 3660000
+    xyz = ply_io.vertex_xyz(points) - [x_offset, y_offset, 0]
+    return ply_io.lod_pyramid(xyz)
+
+
+@st.cache_data(max_entries=64)
+def get_plant_lod(_file_fetcher, season, crop, date, plant_name):
+    """Levels of detail of a plant, cached per plant and date.
+
+    Only the levels within POINT_BUDGET are kept, as float32, so a cached
+    plant stays small however big its cloud. Finer levels are built again
+    when asked for, by get_plant_lod_level.
+
+    Returns:
+      - (points of every level, {level: (N, 3) array}), or None
     """
-    # make change to accomodate filters bc table is not file
-    plant_3d_data = file_fetcher.download_plant_by_index(crop_name)
+    levels = plant_lod_pyramid(_file_fetcher, plant_name)
+    if levels is None:
+        return None
+    first = ply_io.pick_level(levels, POINT_BUDGET)
+    return [len(level) for level in levels], {
+        i: levels[i].astype("float32") for i in range(first, len(levels))
+    }
 
-    # return value is not correct path so get correct path
-    path_final_file = f"individually_called_point_clouds/{crop_name}_timeseries/{file_fetcher.date}_final.ply"
 
-    pcd = o3d.io.read_point_cloud(path_final_file)
-    # Apply offset after opening the point cloud
+@st.cache_data(max_entries=2)
+def get_plant_lod_level(_file_fetcher, season, crop, date, plant_name, level):
+    """A level of detail past POINT_BUDGET, picked with the detail slider."""
+    return plant_lod_pyramid(_file_fetcher, plant_name)[level].astype("float32")
+
+
+@st.cache_resource
+def get_timeseries_cache():
+    # (season, crop, date, plant) -> decimated xyz, shared by every session
+    return OrderedDict(), threading.Lock()
+
+
+def get_plant_timeseries(file_fetcher, season_index, plant_name):
+    """Decimated point clouds of a plant for every date, fetched concurrently.
+
+    Dates already in the shared cache are not fetched again, so only new
+    scan dates cost a request.
+    """
+    cache, lock = get_timeseries_cache()
+    key = (file_fetcher.season, file_fetcher.crop)
+    with lock:
+        cached = {
+            date: cache[key + (date, plant_name)]
+            for date in season_index.dates
+            if key + (date, plant_name) in cache
+        }
+    fetched = file_fetcher.fetch_timeseries_points(
+        season_index, plant_name, skip_dates=cached
+    )
     x_offset = 409000
     y_offset = 3660000
+    with lock:
+        for date, points in fetched.items():
+            xyz = ply_io.vertex_xyz(points) - [x_offset, y_offset, 0]
+            levels = ply_io.lod_pyramid(xyz, min_points=TIMESERIES_POINT_BUDGET // 4)
+            cached[date] = levels[ply_io.pick_level(levels, TIMESERIES_POINT_BUDGET)]
+            cache[key + (date, plant_name)] = cached[date]
+        for date in cached:
+            cache.move_to_end(key + (date, plant_name))
+        while len(cache) > TIMESERIES_CACHE_SIZE:
+            cache.popitem(last=False)
+    return dict(sorted(cached.items()))
+
 
-    #   adjust based on offsets
-    points = np.asarray(pcd.points)
-    xs = points[:, 0] - x_offset
-    ys = points[:, 1] - y_offset
-    zs = points[:, 2]
-    df_dict = {"x": xs, "y": ys, "z": zs}
-    df = pd.DataFrame(df_dict)
+def timeseries_view(file_fetcher, load_season_index, crop_name):
+    """Animated 3D view of a plant across every available scan date."""
+    with st.spinner("Fetching the plant for every date..."):
+        season_index = load_season_index()
+        series = get_plant_timeseries(file_fetcher, season_index, crop_name)
+    if not series:
+        dist_col.write(f"No time series found for {crop_name}")
+        return
+    df = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "x": xyz[:, 0],
+                    "y": xyz[:, 1],
+                    "z": xyz[:, 2],
+                    "date": date[:10],
+                }
+            )
+            for date, xyz in series.items()
+        ],
+        ignore_index=True,
+    )
+    fig = px.scatter_3d(
+        df,
+        title=f"{crop_name} ({len(series)} dates)",
+        x="x",
+        y="y",
+        z="z",
+        color="z",
+        animation_frame="date",
+        range_x=[df["x"].min(), df["x"].max()],
+        range_y=[df["y"].min(), df["y"].max()],
+        range_z=[df["z"].min(), df["z"].max()],
+        range_color=[df["z"].min(), df["z"].max()],
+        color_continuous_scale=[[0.0, "yellow"], [1.0, "green"]],
+    )
+    fig.update_traces(marker=dict(size=3))
+    dist_col.plotly_chart(fig, use_container_width=True)
+
+
+def callback(file_fetcher, crop_name, load_season_index=None):
+    """
+    Callback function to fetch 3D data of a plant, apply an offset to the x and y coordinates,
+    pick a level of detail within the point budget, and generate a 3D scatter plot of the point cloud using Plotly.
+    With a season index loader the user can switch to the plant's growth time series.
+    """
+    if load_season_index is not None and dist_col.toggle(
+        "Show growth time series", key=f"timeseries_{crop_name}"
+    ):
+        timeseries_view(file_fetcher, load_season_index, crop_name)
+        return
+    plant = (file_fetcher.season, file_fetcher.crop, file_fetcher.date, crop_name)
+    lod = get_plant_lod(file_fetcher, *plant)
+    if lod is None:
+        dist_col.write(f"No point cloud found for {crop_name}")
+        return
+    sizes, levels = lod
+    # finest level first, so the slider goes from coarse to full resolution
+    level_ids = list(range(len(sizes)))[::-1]
+    selected_level = dist_col.select_slider(
+        "Point cloud detail",
+        options=level_ids,
+        value=min(levels),
+        format_func=lambda i: f"{sizes[i]} points",
+        key=f"lod_{crop_name}",
+    )
+    points = levels.get(selected_level)
+    if points is None:
+        points = get_plant_lod_level(file_fetcher, *plant, selected_level)
+    df = pd.DataFrame({"x": points[:, 0], "y": points[:, 1], "z": points[:, 2]})
     # Use plotly to display stuff
     color_scale = [[0.0, "yellow"], [1.0, "green"]]
     fig = px.scatter_3d(
@@ -808,6 +1255,110 @@ def callback(file_fetcher, crop_name):
     dist_col.plotly_chart(fig, use_container_width=True)
 
 
+@st.cache_resource
+def get_prefetcher():
+    return prefetch.Prefetcher()
+
+
+def warm_date(_session, index, season, sensor, crop, date, detection_date):
+    """Download and ingest what data_analysis needs for a date, showing nothing.
+
+    Runs on prefetch workers, so it only calls functions free of streamlit.
+
+    Args:
+      - detection_date (string): date of the Plant Detection CSV, for 3D
+        sensors the nearest stereoTop date, resolved by the caller
+    """
+    detection_sensor = "stereoTop" if "3D" in sensor else sensor
+    plant_detect_name = fetch_plant_detection_csv(
+        _session, index, season, detection_sensor, crop, detection_date
+    )
+    if plant_detect_name != "" and "3D" in sensor:
+        ingest_indv_plant_data_3D(_session, index, season, crop, date)
+
+
+def prefetch_neighbours(_session, index, season, sensor, crop, dates, date, sensors):
+    """Warm the dates the user is likely to pick next, and the other sensors.
+
+    Dates come from the steps this session took through the slider so far,
+    the other sensors from their scan closest to the selected date.
+    """
+    if "prefetch_group" not in st.session_state:
+        st.session_state["prefetch_group"] = uuid.uuid4().hex
+        st.session_state["navigation"] = prefetch.NavigationModel()
+    position = dates.index(date)
+    st.session_state["navigation"].observe(position)
+    predicted = st.session_state["navigation"].predict(position, len(dates))
+
+    # resolved here, the workers must not touch streamlit's caches
+    alignment = get_date_alignment(_session, index, season, crop)
+
+    def job(job_sensor, job_date):
+        key = (season, job_sensor, crop, job_date)
+        detection_date = job_date
+        if "3D" in job_sensor:
+            match = alignment.nearest(
+                job_date, ("stereoTop", "0"), (job_sensor, "0")
+            )
+            if match is None:
+                return None
+            detection_date = match[0]
+        return key, functools.partial(
+            warm_date,
+            _session,
+            index,
+            season,
+            job_sensor,
+            crop,
+            job_date,
+            detection_date,
+        )
+
+    jobs = [job(sensor, dates[p]) for p in predicted[:2]]
+    for other in sensors:
+        match = alignment.nearest(date, (other, "0"), (sensor, "0"))
+        if other != sensor and match is not None:
+            jobs.append(job(other, match[0]))
+    jobs.extend(job(sensor, dates[p]) for p in predicted[2:])
+    jobs = [item for item in jobs if item is not None]
+    # season-wide files every date needs
+    jobs.append(
+        (("fieldbook", season), functools.partial(download_fieldbook, index, season))
+    )
+    clustering = index[season.split(" ")[1]]["metadata"].get("plant-clustering", {})
+    for clustering_sensor in {"stereoTop", sensor} & set(clustering):
+        jobs.append(
+            (
+                ("plant-clustering", season, clustering_sensor),
+                functools.partial(
+                    download_plant_clustering_csv, index, season, clustering_sensor
+                ),
+            )
+        )
+    get_prefetcher().schedule(st.session_state["prefetch_group"], jobs)
+
+
+@st.cache_resource
+def get_webdav_client():
+    options = {
+        "webdav_hostname": WEBDAV_HOSTNAME,
+        "webdav_login": WEBDAV_AUTH[0],
+        "webdav_password": WEBDAV_AUTH[1],
+        "webdav_root": "/",
+    }
+    # one client per process, sharing the pooled transport with download_file
+    return transport.attach(Client(options))
+
+
+@st.cache_resource
+def get_catalog(_session, index):
+    """SQLite catalog of the CyVerse folders, refreshed in the background."""
+    cyverse_catalog = catalog.Catalog()
+    cyverse_catalog.start_background_refresh(_session, catalog.index_roots(index))
+    listing.use_catalog(cyverse_catalog)
+    return cyverse_catalog
+
+
 def main():
     # Setting up the app for aesthetic changes
     st.set_page_config(
@@ -831,18 +1382,13 @@ def main():
     st.title("Dashboard")
     # To access Cyverse WebDAV
     try:
-        options = {
-            "webdav_hostname": "https://data.cyverse.org/dav",
-            "webdav_login": "phytooracle",
-            "webdav_password": "mac_scanalyzer",
-            "webdav_root": "/",
-        }
-        _session = Client(options)
+        _session = get_webdav_client()
     except:
         st.write("Something went wrong establishing a iRODS session. Contact support.")
     else:
         with open("index.json", "r") as file:
             index = json.load(file)
+        cyverse_catalog = get_catalog(_session, index)
         avbl_seasons = [
             f"Season {item}" for item in sorted(index.keys(), key=lambda x: int(x))
         ]
@@ -868,41 +1414,59 @@ def main():
             plotly_col, dist_col = vis_container.columns(2)
             col1, col2 = st.columns(2)
             filter_sec.header(":blue[Data and its Visualization]")
-            try:
-                # implement cache
-                a = 1 / 0
-                pass
-            except:
-                plant_detect_name = get_plant_detection_csv(
-                    _session,
-                    index,
-                    selected_season,
-                    selected_sensor,
-                    selected_crop,
-                    selected_date,
+            plant_detect_name = get_plant_detection_csv(
+                _session,
+                index,
+                selected_season,
+                selected_sensor,
+                selected_crop,
+                selected_date,
+            )
+            if plant_detect_name == "":
+                st.write(
+                    f"No Plant Detection CSV is present for this sensor on this date."
                 )
-                if plant_detect_name == "":
-                    st.write(
-                        f"No Plant Detection CSV is present for this sensor on this date."
-                    )
-                else:
-                    with filter_sec:
-                        with st.spinner("This might take some time. Please wait..."):
-                            field_book_name = download_fieldbook(index, selected_season)
-                            if field_book_name == "":
-                                st.write("No fieldbook found for this season")
-                            else:
-                                data_analysis(
-                                    _session,
-                                    index,
-                                    selected_season,
-                                    selected_crop,
-                                    selected_sensor,
-                                    selected_date,
-                                    field_book_name,
-                                    plant_detect_name,
-                                )
-                                print("Good Job")
+            else:
+                with filter_sec:
+                    with st.spinner("This might take some time. Please wait..."):
+                        field_book_name = download_fieldbook(index, selected_season)
+                        if field_book_name == "":
+                            st.write("No fieldbook found for this season")
+                        else:
+                            data_analysis(
+                                _session,
+                                index,
+                                selected_season,
+                                selected_crop,
+                                selected_sensor,
+                                selected_date,
+                                field_book_name,
+                                plant_detect_name,
+                            )
+                            print("Good Job")
+            prefetch_neighbours(
+                _session,
+                index,
+                selected_season,
+                selected_sensor,
+                selected_crop,
+                list(level_0_dates.keys()),
+                selected_date,
+                avbl_sensors,
+            )
+        with st.sidebar.expander("Cache statistics"):
+            st.json(
+                {
+                    "listings": listing.stats(),
+                    "connections": transport.pool_stats(),
+                    "request_policy": transport.policy_stats(),
+                    "artifacts": artifacts.get_store().stats(),
+                    "catalog": cyverse_catalog.stats,
+                    "prefetch": dict(
+                        get_prefetcher().stats, pending=get_prefetcher().pending()
+                    ),
+                }
+            )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+import numpy as np
+
+# dates further apart than this are not treated as the same scan
+DATE_TOLERANCE_DAYS = 2
+
+
+def to_days(dates):
+    """ISO dates ("%Y-%m-%d") as integer days since the epoch."""
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+def nearest_positions(source_days, target_days):
+    """Position in target_days of the nearest date to each source day.
+
+    target_days must be sorted. Ties go to the earlier date.
+
+    Returns:
+      - (positions, distances in days), positions are -1 if target is empty
+    """
+    source_days = np.asarray(source_days, dtype=np.int64)
+    if len(target_days) == 0:
+        return (
+            np.full(len(source_days), -1, dtype=np.int64),
+            np.full(len(source_days), np.iinfo(np.int64).max, dtype=np.int64),
+        )
+    right = np.searchsorted(target_days, source_days)
+    left = np.clip(right - 1, 0, len(target_days) - 1)
+    right = np.clip(right, 0, len(target_days) - 1)
+    left_distance = np.abs(source_days - target_days[left])
+    right_distance = np.abs(target_days[right] - source_days)
+    use_right = right_distance < left_distance
+    return np.where(use_right, right, left), np.where(
+        use_right, right_distance, left_distance
+    )
+
+
+class DateAlignment:
+    """Nearest scan date of every sensor for every scan date of every other.
+
+    Built once from the date lists of a season and crop, each a dict of
+    date -> folder keyed by (sensor, level). Lookups of a known date are
+    a table read; other dates bisect the sorted target dates.
+    """
+
+    def __init__(self, date_lists):
+        self.dates = {}
+        self.days = {}
+        self.folders = {}
+        for key, date_folders in date_lists.items():
+            dates = sorted(date_folders)
+            self.dates[key] = dates
+            self.days[key] = to_days(dates)
+            self.folders[key] = [date_folders[date] for date in dates]
+        self.positions = {
+            key: {date: i for i, date in enumerate(dates)}
+            for key, dates in self.dates.items()
+        }
+        # (source, target) -> (positions, distances) for each source date
+        self.table = {
+            (source, target): nearest_positions(self.days[source], self.days[target])
+            for source in self.days
+            for target in self.days
+            if source != target
+        }
+
+    def nearest(self, date, target, source=None, tolerance=DATE_TOLERANCE_DAYS):
+        """Closest date of `target` to `date`.
+
+        Args:
+          - date (string): "%Y-%m-%d" date
+          - target (tuple): (sensor, level) whose dates are searched
+          - source (tuple): (sensor, level) `date` was taken from, if known
+          - tolerance (int): most days between the two dates
+
+        Returns:
+          - (date, folder, distance in days), or None when nothing is close
+        """
+        if target not in self.days:
+            return None
+        source_position = self.positions.get(source, {}).get(date)
+        if source == target and source_position is not None:
+            return date, self.folders[target][source_position], 0
+        if source_position is not None:
+            positions, distances = self.table[(source, target)]
+            position = positions[source_position]
+            distance = distances[source_position]
+        else:
+            positions, distances = nearest_positions(to_days([date]), self.days[target])
+            position, distance = positions[0], distances[0]
+        if position < 0 or distance > tolerance:
+            return None
+        return self.dates[target][position], self.folders[target][position], int(distance)
@@ -1,18 +1,485 @@
 import os
 from pathlib import Path
-import requests
 import json
-import re
+import bisect
+import itertools
+import tarfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import artifacts
+import ply_io
+import transport
+
+# bytes of unwanted data we are willing to download to merge two tar members
+GAP_TOLERANCE = 64 * 1024
+# a merged range request never grows past this many bytes
+MAX_SPAN = 32 * 1024 * 1024
+
+
+def member_span(entry):
+    """Byte span [start, end) of a tar member's data, skipping its header."""
+    start = entry["block"] * 512 + 512
+    return start, start + entry["file_size"]
+
+
+def plan_ranges(entries, gap_tolerance=GAP_TOLERANCE, max_span=MAX_SPAN):
+    """Sort tar members by offset and merge the ones that sit close together.
+
+    Args:
+      - entries (list): index entries with "block" and "file_size" keys
+      - gap_tolerance (int): largest gap in bytes bridged between two members
+      - max_span (int): stop growing a merged span past this many bytes
+
+    Returns:
+      - list of [start, end, members] where end is exclusive and members is a
+        list of (entry, offset of the entry inside the merged buffer)
+    """
+    plan = []
+    for entry in sorted(entries, key=lambda e: e["block"]):
+        start, end = member_span(entry)
+        if plan:
+            span = plan[-1]
+            if start - span[1] <= gap_tolerance and end - span[0] <= max_span:
+                span[2].append((entry, start - span[0]))
+                span[1] = max(span[1], end)
+                continue
+        plan.append([start, end, [(entry, 0)]])
+    return plan
+
+
+def write_json(path, data):
+    """Write json next to `path` and move it into place, never half-written."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as phile:
+        json.dump(data, phile)
+    os.replace(tmp_path, path)
+
+
+def write_npy(path, array):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as phile:
+        np.save(phile, array)
+    os.replace(tmp_path, path)
+
+
+# bytes requested at a time while walking the headers of a remote tar: a
+# header after a big member is read alone in MIN_READAHEAD bytes, and runs of
+# small members double the read each time they outgrow it, up to READAHEAD
+MIN_READAHEAD = 4 * 1024
+READAHEAD = 256 * 1024
+
+# one record per ply in the tar, sorted by plant then by offset
+INDEX_DTYPE = np.dtype(
+    [("block", "<i8"), ("file_size", "<i8"), ("name_id", "<i4")]
+)
+
+
+def parse_index_lines(lines):
+    """Yield (block, file_size, path) for every ply in a `tar -Rtv` listing."""
+    for line in lines:
+        if "ply" in line:
+            parts = line.split()
+            block = int(parts[1].replace(":", ""))
+            file_size = int(parts[4])
+            yield block, file_size, parts[7]
+
+
+def parse_pax_path(data):
+    """Return the path record of a pax extended header, if it has one."""
+    i = 0
+    while i < len(data):
+        space = data.find(b" ", i)
+        if space == -1:
+            break
+        length = int(data[i:space])
+        key, _, value = data[space + 1 : i + length - 1].partition(b"=")
+        if key == b"path":
+            return value.decode("utf-8", "surrogateescape")
+        i += length
+    return None
+
+
+def scan_remote_tar(url, readahead=READAHEAD, suffix=".ply", auth=None):
+    """Yield (block, file_size, path) for every member ending in `suffix`.
+
+    Walks the 512-byte member headers of a remote tar with ranged reads.
+    The header following a member bigger than the current read window is
+    fetched on its own, so large members cost a few KiB each. Runs of small
+    members grow the window up to `readahead` bytes so they are parsed from
+    one buffer.
+    """
+    session = transport.get_session()
+    buffer, buffer_start = b"", 0
+    window = MIN_READAHEAD
+
+    def read(start, length):
+        nonlocal buffer, buffer_start, window
+        if start < buffer_start or start + length > buffer_start + len(buffer):
+            res = session.get(
+                url,
+                auth=auth,
+                headers={"Range": f"bytes={start}-{start + max(length, window) - 1}"},
+            )
+            # still in a run of small members, read further next time
+            window = min(window * 2, readahead)
+            if res.status_code == 416:
+                return b""
+            res.raise_for_status()
+            # a server ignoring Range sends the whole tar from byte 0
+            buffer = res.content
+            artifacts.get_store().add_transferred(len(buffer))
+            buffer_start = start if res.status_code == 206 else 0
+        return buffer[start - buffer_start : start - buffer_start + length]
+
+    offset = 0
+    long_name = None
+    while True:
+        header = read(offset, 512)
+        if len(header) < 512 or header == bytes(512):
+            return
+        info = tarfile.TarInfo.frombuf(header, tarfile.ENCODING, "surrogateescape")
+        data_start = offset + 512
+        next_offset = data_start + -(-info.size // 512) * 512
+        if info.type == tarfile.GNUTYPE_LONGNAME:
+            long_name = (
+                read(data_start, info.size)
+                .rstrip(b"\0")
+                .decode("utf-8", "surrogateescape")
+            )
+        elif info.type in (tarfile.XHDTYPE, tarfile.XGLTYPE):
+            long_name = parse_pax_path(read(data_start, info.size)) or long_name
+        else:
+            name = long_name or info.name
+            long_name = None
+            if info.isreg() and name.endswith(suffix):
+                yield offset // 512, info.size, name
+        if next_offset - data_start > window:
+            # the next header is past this member, read just that one
+            window = MIN_READAHEAD
+        offset = next_offset
+
+
+def remote_validators(url, auth=None):
+    """Content-Length and ETag of a remote file, to tell if it changed."""
+    res = transport.get_session().head(url, auth=auth, allow_redirects=True)
+    res.raise_for_status()
+    return {
+        "size": res.headers.get("Content-Length"),
+        "etag": res.headers.get("ETag"),
+    }
+
+
+def load_or_scan_members(url, index_path, suffix, auth=None):
+    """(block, file_size, path) of a remote tar's members, cached as json.
+
+    The cached offsets are only used while the tar's Content-Length and
+    ETag are the ones it was scanned with, a replaced tar is scanned again.
+    """
+    validators = remote_validators(url, auth)
+    if os.path.exists(index_path):
+        with open(index_path, "r") as phile:
+            cached = json.load(phile)
+        if (
+            cached["url"] == url
+            and cached["suffix"] == suffix
+            and cached.get("validators") == validators
+        ):
+            return [tuple(member) for member in cached["members"]]
+    members = list(scan_remote_tar(url, suffix=suffix, auth=auth))
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    write_json(
+        index_path,
+        {"url": url, "suffix": suffix, "validators": validators, "members": members},
+    )
+    artifacts.get_store().record(index_path, url, index_path, [index_path])
+    return members
+
+
+def fetch_span(url, span, auth=None):
+    """Data of the members of one planned span, from a single range request."""
+    start, end, members = span
+    res = transport.get_session().get(
+        url, auth=auth, headers={"Range": f"bytes={start}-{end - 1}"}
+    )
+    res.raise_for_status()
+    buffer = res.content
+    artifacts.get_store().add_transferred(len(buffer))
+    if len(buffer) != end - start:
+        raise IOError(
+            f"expected {end - start} bytes at offset {start}, got {len(buffer)}"
+        )
+    return [
+        (entry, buffer[offset : offset + entry["file_size"]])
+        for entry, offset in members
+    ]
+
+
+def fetch_members(
+    url, entries, gap_tolerance=GAP_TOLERANCE, max_workers=8, auth=None, strict=False
+):
+    """Fetch the data of several tar members with as few requests as possible.
+
+    Adjacent members are merged into a single range request by plan_ranges
+    and the merged spans are fetched concurrently.
+
+    Args:
+      - strict (bool): raise on a failed span instead of skipping its members
+
+    Returns:
+      - list of (entry, bytes) for every member that was fetched
+    """
+    plan = plan_ranges(entries, gap_tolerance)
+    fetched = []
+    if not plan:
+        return fetched
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(plan))) as executor:
+        futures = [executor.submit(fetch_span, url, span, auth) for span in plan]
+        for future in as_completed(futures):
+            try:
+                fetched.extend(future.result())
+            except Exception as e:
+                if strict:
+                    raise
+                print(e)
+                print("failed to fetch part of", url)
+    return fetched
+
+
+def iter_member_batches(
+    url, entries, gap_tolerance=GAP_TOLERANCE, max_workers=8, auth=None, strict=False
+):
+    """Yield the (entry, bytes) pairs of each planned span, in archive order.
+
+    Like fetch_members, but at most `max_workers` spans are fetched ahead of
+    the caller, so memory stays bounded by about max_workers * MAX_SPAN
+    however many members there are.
+
+    Args:
+      - strict (bool): raise on a failed span instead of skipping its members
+    """
+    plan = plan_ranges(entries, gap_tolerance)
+    if not plan:
+        return
+    spans = iter(plan)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(plan))) as executor:
+        try:
+            for span in itertools.islice(spans, max_workers):
+                pending.append(executor.submit(fetch_span, url, span, auth))
+            while pending:
+                future = pending.popleft()
+                for span in itertools.islice(spans, 1):
+                    pending.append(executor.submit(fetch_span, url, span, auth))
+                try:
+                    batch = future.result()
+                except Exception as e:
+                    if strict:
+                        raise
+                    print(e)
+                    print("failed to fetch part of", url)
+                    continue
+                yield batch
+        finally:
+            # the caller stopped early or a span failed
+            for future in pending:
+                future.cancel()
+
+
+class TarIndex:
+    """Compact plant name -> tar members lookup backed by a NumPy array.
+
+    The records live in `<base>.idx.npy` and are memory-mapped on load, the
+    plant names and member paths live in the `<base>.idx.json` string table.
+    """
+
+    def __init__(self, records, names, paths):
+        self.records = records
+        self.names = names
+        self.paths = paths
+
+    @classmethod
+    def from_entries(cls, entries):
+        """Build an index from an iterable of (block, file_size, path)."""
+        entries = sorted(
+            entries, key=lambda entry: (Path(entry[2]).parent.stem, entry[0])
+        )
+        names = sorted({Path(path).parent.stem for _, _, path in entries})
+        name_ids = {name: i for i, name in enumerate(names)}
+        records = np.empty(len(entries), dtype=INDEX_DTYPE)
+        records["block"] = [entry[0] for entry in entries]
+        records["file_size"] = [entry[1] for entry in entries]
+        records["name_id"] = [name_ids[Path(entry[2]).parent.stem] for entry in entries]
+        return cls(records, names, [entry[2] for entry in entries])
+
+    @classmethod
+    def load(cls, base):
+        records = np.load(f"{base}.idx.npy", mmap_mode="r")
+        with open(f"{base}.idx.json", "r") as phile:
+            strings = json.load(phile)
+        return cls(records, strings["names"], strings["paths"])
+
+    @classmethod
+    def load_or_build(cls, index_filename):
+        """Load the binary index next to a text index, building it if stale."""
+        base = os.path.splitext(index_filename)[0]
+        if os.path.exists(f"{base}.idx.npy") and (
+            not os.path.exists(index_filename)
+            or os.path.getmtime(f"{base}.idx.npy") >= os.path.getmtime(index_filename)
+        ):
+            return cls.load(base)
+        with open(index_filename, "r") as phile:
+            tar_index = cls.from_entries(parse_index_lines(phile))
+        tar_index.save(base)
+        tar_index.track(base, index_filename)
+        return tar_index
+
+    def track(self, base, remote):
+        """Put the saved index files under the artifact store's disk quota."""
+        paths = [f"{base}.idx.npy", f"{base}.idx.json"]
+        artifacts.get_store().record(paths[0], remote, paths[0], paths)
+
+    def save(self, base):
+        # both files are replaced whole and the .npy goes last, so a present
+        # .npy implies a full index
+        write_json(f"{base}.idx.json", {"names": self.names, "paths": self.paths})
+        write_npy(f"{base}.idx.npy", np.asarray(self.records, dtype=INDEX_DTYPE))
+
+    def rows(self, plant_name):
+        i = bisect.bisect_left(self.names, plant_name)
+        if i == len(self.names) or self.names[i] != plant_name:
+            return slice(0, 0)
+        name_ids = self.records["name_id"]
+        return slice(
+            int(np.searchsorted(name_ids, i, side="left")),
+            int(np.searchsorted(name_ids, i, side="right")),
+        )
+
+    def get(self, plant_name, default=None):
+        rows = self.rows(plant_name)
+        if rows.start == rows.stop:
+            return default
+        return [
+            {
+                "block": int(self.records["block"][row]),
+                "file_size": int(self.records["file_size"][row]),
+                "path": self.paths[row],
+                "filename": Path(self.paths[row]).stem,
+            }
+            for row in range(rows.start, rows.stop)
+        ]
+
+    def __contains__(self, plant_name):
+        rows = self.rows(plant_name)
+        return rows.start != rows.stop
+
+    def __len__(self):
+        return len(self.names)
+
+    def keys(self):
+        return list(self.names)
+
+
+SEASON_INDEX_DTYPE = np.dtype(
+    [("block", "<i8"), ("file_size", "<i8"), ("name_id", "<i4"), ("date_id", "<i2")]
+)
+
+
+class SeasonIndex:
+    """Plant name -> tar members across every scan date of a season.
+
+    Records are sorted by plant then date and `offsets[name_id]` marks where
+    each plant's records start, so a plant's whole growth series is one dict
+    lookup and one slice. Stored as `<base>.npy` and a `<base>.json` string
+    table of dates, plant names and member paths.
+    """
+
+    def __init__(self, records=None, dates=None, names=None, paths=None):
+        self.records = (
+            records if records is not None else np.empty(0, SEASON_INDEX_DTYPE)
+        )
+        self.dates = dates or []
+        self.names = names or []
+        self.paths = paths or []
+        self.name_ids = {name: i for i, name in enumerate(self.names)}
+        self.offsets = np.searchsorted(
+            self.records["name_id"], np.arange(len(self.names) + 1)
+        )
+
+    @classmethod
+    def load(cls, base):
+        if not os.path.exists(f"{base}.npy"):
+            return cls()
+        records = np.load(f"{base}.npy", mmap_mode="r")
+        with open(f"{base}.json", "r") as phile:
+            strings = json.load(phile)
+        return cls(records, strings["dates"], strings["names"], strings["paths"])
+
+    def save(self, base):
+        write_json(
+            f"{base}.json",
+            {"dates": self.dates, "names": self.names, "paths": self.paths},
+        )
+        write_npy(f"{base}.npy", np.asarray(self.records, dtype=SEASON_INDEX_DTYPE))
+
+    def add_date(self, date, tar_index):
+        """Return a new SeasonIndex that also covers one date's TarIndex."""
+        if date in self.dates:
+            return self
+        dates = self.dates + [date]
+        names = sorted(set(self.names) | set(tar_index.names))
+        name_ids = {name: i for i, name in enumerate(names)}
+        remap = np.array([name_ids[name] for name in self.names], dtype=np.int32)
+        new_remap = np.array(
+            [name_ids[name] for name in tar_index.names], dtype=np.int32
+        )
+        old = np.array(self.records, dtype=SEASON_INDEX_DTYPE)
+        old["name_id"] = remap[old["name_id"]] if len(old) else old["name_id"]
+        new = np.empty(len(tar_index.records), dtype=SEASON_INDEX_DTYPE)
+        new["block"] = tar_index.records["block"]
+        new["file_size"] = tar_index.records["file_size"]
+        new["name_id"] = (
+            new_remap[tar_index.records["name_id"]] if len(new) else 0
+        )
+        new["date_id"] = len(dates) - 1
+        records = np.concatenate([old, new])
+        paths = np.array(self.paths + list(tar_index.paths), dtype=object)
+        order = np.lexsort((records["block"], records["date_id"], records["name_id"]))
+        return SeasonIndex(records[order], dates, names, list(paths[order]))
+
+    def get(self, plant_name, default=None):
+        """Every indexed member of a plant, tagged with and sorted by scan date."""
+        name_id = self.name_ids.get(plant_name)
+        if name_id is None:
+            return default
+        entries = [
+            {
+                "date": self.dates[int(self.records["date_id"][row])],
+                "block": int(self.records["block"][row]),
+                "file_size": int(self.records["file_size"][row]),
+                "path": self.paths[row],
+                "filename": Path(self.paths[row]).stem,
+            }
+            for row in range(self.offsets[name_id], self.offsets[name_id + 1])
+        ]
+        return sorted(entries, key=lambda entry: entry["date"])
+
+    def __contains__(self, plant_name):
+        return plant_name in self.name_ids
 
 
 class Fetcher:
-    def __init__(self, out_dir, season, level, date, crop, index_filename):
+    def __init__(
+        self, out_dir, season, level, date, crop, index_filename, max_workers=8
+    ):
         self.out_dir = out_dir
-        self.season = season
+        # accept both "14" and the dashboard's "Season 14"
+        self.season = season.split(" ")[-1]
         self.level = level
         self.date = date
         self.crop = crop
-        self.index_date = self.json_index(date, index_filename)
+        # upper bound on range requests in flight at once
+        self.max_workers = max_workers
         self.irods_dict = {
             "server_path": "/iplant/home/shared/phytooracle/",
             "season": {
@@ -24,69 +491,75 @@ class Fetcher:
                 "15": "season_15_lettuce_yr_2022",
             },
         }
+        self.index_date = self.load_index(date, index_filename)
 
     # Maybe move this over to dashboard since file must be downloaded there
-    def json_index(self, date, index_filename, writeout=True):  # , writeout=False
-        # index_filename = f"{date}_segmentation_pointclouds_index"
-        json_index = {}
-
+    def load_index(self, date, index_filename):
         # sometimes theres' just no file for that date
         try:
-            index_file = open(index_filename, "r").read()
-            # for each line in the file make an element in the dictionary by plantname
-            lines = index_file.split("\n")
-            for line in lines:
-                if "ply" in line:
-                    # get size
-                    clean_line = re.sub("\s+", " ", line)
-                    parts = clean_line.split(" ")
-                    #             print("\n".join([f"{i},{p}" for i,p in enumerate(parts)]))
-                    block = int(parts[1].replace(":", ""))
-                    file_size = int(parts[4])
-                    path = Path(parts[7])
-                    name = path.parent.stem
-                    json_index.setdefault(name, []).append(
-                        {
-                            "block": block,
-                            "file_size": file_size,
-                            "path": str(path),
-                            "filename": path.stem,
-                        }
-                    )
-            if writeout:
-                print("Writing to file.")
-                index_filename = index_filename.split(".")[0]
-                fn = f"{index_filename}.json"
-                with open(fn, "w") as phile:
-                    phile.write(json.dumps(json_index))
-
+            return TarIndex.load_or_build(index_filename)
         except Exception as e:
             print(e)
             print("date missing tar index", date)
-        return json_index
+        try:
+            return self.index_from_remote_tar(index_filename)
+        except Exception as e:
+            print(e)
+            print("could not index remote tar for", date)
+        return TarIndex.from_entries([])
+
+    def index_from_remote_tar(self, index_filename):
+        """Build the index by walking the tar headers and save it locally."""
+        print("Indexing remote tar headers.")
+        tar_index = TarIndex.from_entries(scan_remote_tar(self.tar_url()))
+        base = os.path.splitext(index_filename)[0]
+        tar_index.save(base)
+        tar_index.track(base, self.tar_url())
+        return tar_index
 
     def make_range_request(self, url, start, end):
         range_header = {"Range": f"bytes={start}-{end}"}
-        res = requests.get(url, headers=range_header)
+        res = transport.get_session().get(url, headers=range_header)
+        # an error page must not be written out as point cloud bytes
+        res.raise_for_status()
         return res.content
 
-    # ask emmanuel about all_dates and what it is
-    # all dates currently not instatiated
-    # INCOMPLETE
-    def download_plant_by_index(self, plant_name):
-        folder = os.path.join(self.out_dir, "_".join([plant_name, "timeseries"]))
-        # folder = Path(f"plant_plys/{plant_name}_timeseries")
-        # folder.mkdir(exist_ok=True,parents=True)
-        os.makedirs(folder, exist_ok=True)
-        # go through the dates
-
+    def tar_url(self, date=None):
         season_path = self.irods_dict["season"][self.season]
+        date = date or self.date
 
         # construct a url for the date
         if self.season == "10" or self.season == "11":
-            ipath = f"https://data.cyverse.org/dav-anon/iplant/commons/community_released/phytooracle/{season_path}/{self.level}/scanner3DTop/{self.date}/individual_plants_out/{self.date}_segmentation_pointclouds.tar"
-        else:
-            ipath = f"https://data.cyverse.org/dav-anon/iplant/commons/community_released/phytooracle/{season_path}/{self.level}/scanner3DTop/{self.crop}/{self.date}/individual_plants_out/{self.date}_segmentation_pointclouds.tar"
+            return f"https://data.cyverse.org/dav-anon/iplant/commons/community_released/phytooracle/{season_path}/{self.level}/scanner3DTop/{date}/individual_plants_out/{date}_segmentation_pointclouds.tar"
+        return f"https://data.cyverse.org/dav-anon/iplant/commons/community_released/phytooracle/{season_path}/{self.level}/scanner3DTop/{self.crop}/{date}/individual_plants_out/{date}_segmentation_pointclouds.tar"
+
+    def plant_folder(self, plant_name):
+        folder = os.path.join(self.out_dir, "_".join([plant_name, "timeseries"]))
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    def ply_path(self, folder, ply):
+        return f'{folder}/{self.date}_{ply["filename"]}.ply'
+
+    def download_ply(self, ipath, folder, ply):
+        res = self.ply_path(folder, ply)
+        if Path(res).exists():
+            print("already downloaded", ply["filename"])
+            return res
+        # if we don't add a 512 to the start we get the tar header also
+        start, end = member_span(ply)
+        ply_buffer = self.make_range_request(ipath, start, end - 1)
+        with open(res, "wb") as phile:
+            phile.write(ply_buffer)
+        artifacts.get_store().record(res, ipath, res, [res])
+        return res
+
+    # all dates of a plant are looked up through SeasonIndex
+    def download_plant_by_index(self, plant_name):
+        folder = self.plant_folder(plant_name)
+        # go through the dates
+
+        ipath = self.tar_url()
         # print(ipath)
         # look through all_dates for the plant data
         # index by plant
@@ -97,22 +570,118 @@ class Fetcher:
             #             print(json.dumps(plant_files,indent=2))
             # lets go get all the plys on the names we care about
             for ply in plant_files:
-                res = f'{folder}/{self.date}_{ply["filename"]}.ply'
                 if not "final" in ply["filename"]:
                     continue
-                if Path(res).exists():
-                    print("already downloaded", ply["filename"])
-                    continue
-                # if we don't add a 512 to the start we get the tar header also
-                start = ply["block"] * 512 + 512
-                end = start + ply["file_size"]
-                # print(ipath)
-                ply_buffer = self.make_range_request(ipath, start, end)
+                return self.download_ply(ipath, folder, ply)
 
-                # print(ply_buffer)
-                with open(res, "wb") as phile:
-                    phile.write(ply_buffer)
+            # have to add return for either the data itself or the local location of the downloaded file
 
-                return res
+    def fetch_plant_points(self, plant_name, name_filter="final"):
+        """Decode a plant's ply straight from the range request bytes.
 
-            # have to add return for either the data itself or the local location of the downloaded file
+        A copy downloaded earlier by download_plants is memory-mapped instead.
+
+        Returns:
+          - structured vertex array, or None when the plant is not in the index
+        """
+        plant_files = [
+            ply
+            for ply in self.index_date.get(plant_name, [])
+            if name_filter in ply["filename"]
+        ]
+        if not plant_files:
+            return None
+        ply = plant_files[0]
+        folder = os.path.join(self.out_dir, "_".join([plant_name, "timeseries"]))
+        res = self.ply_path(folder, ply)
+        if Path(res).exists():
+            return ply_io.read_vertices(res)
+        start, end = member_span(ply)
+        ply_buffer = self.make_range_request(self.tar_url(), start, end - 1)
+        return ply_io.read_vertices(ply_buffer)
+
+    def fetch_timeseries_points(
+        self, season_index, plant_name, name_filter="final", skip_dates=()
+    ):
+        """Decode a plant's ply for every date of a SeasonIndex concurrently.
+
+        Args:
+          - season_index (SeasonIndex): season-wide index the plant is looked up in
+          - skip_dates (iterable): dates the caller already has
+
+        Returns:
+          - dict mapping date to structured vertex array
+        """
+        wanted = {}
+        for entry in season_index.get(plant_name, []):
+            if name_filter in entry["filename"] and entry["date"] not in skip_dates:
+                wanted.setdefault(entry["date"], entry)
+        points = {}
+
+        def fetch(entry):
+            start, end = member_span(entry)
+            ply_buffer = self.make_range_request(
+                self.tar_url(entry["date"]), start, end - 1
+            )
+            return ply_io.read_vertices(ply_buffer)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(fetch, entry): date for date, entry in wanted.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    points[futures[future]] = future.result()
+                except Exception as e:
+                    print(e)
+                    print("failed to fetch", plant_name, "for", futures[future])
+        return points
+
+    def download_plants(self, plant_names, name_filter=None):
+        """Download every matching ply for one or more plants concurrently.
+
+        Args:
+          - plant_names (str or list): plant name(s) to look up in the index
+          - name_filter (string): only fetch entries whose filename contains this
+
+        Returns:
+          - dict mapping each plant name to the list of local ply paths
+        """
+        if isinstance(plant_names, str):
+            plant_names = [plant_names]
+        ipath = self.tar_url()
+        downloaded = {plant_name: [] for plant_name in plant_names}
+        jobs = []
+        for plant_name in plant_names:
+            plant_files = self.index_date.get(plant_name, [])
+            if not plant_files:
+                continue
+            folder = self.plant_folder(plant_name)
+            for ply in plant_files:
+                if name_filter and name_filter not in ply["filename"]:
+                    continue
+                jobs.append((plant_name, folder, ply))
+        if not jobs:
+            return downloaded
+        pending = {}
+        for plant_name, folder, ply in jobs:
+            res = self.ply_path(folder, ply)
+            if Path(res).exists():
+                downloaded[plant_name].append(res)
+            else:
+                pending[id(ply)] = (plant_name, res)
+        wanted = [ply for _, _, ply in jobs if id(ply) in pending]
+        for ply, ply_buffer in self.fetch_members(ipath, wanted):
+            plant_name, res = pending[id(ply)]
+            with open(res, "wb") as phile:
+                phile.write(ply_buffer)
+            artifacts.get_store().record(res, ipath, res, [res], save=False)
+            downloaded[plant_name].append(res)
+        artifacts.get_store().flush()
+        for paths in downloaded.values():
+            paths.sort()
+        return downloaded
+
+    def fetch_members(self, ipath, entries, gap_tolerance=GAP_TOLERANCE):
+        """Fetch the data of several ply members, see fetch_members."""
+        return fetch_members(ipath, entries, gap_tolerance, self.max_workers)
@@ -0,0 +1,261 @@
+import io
+import os
+import re
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# string columns with at most this share of distinct values become categoricals
+CATEGORY_RATIO = 0.5
+# integer-valued key columns stored as nullable integers
+KEY_COLUMNS = ["plot", "range", "column", "row", "rep"]
+# coordinates keep float64, float32 is only good to about a meter at these values
+FULL_PRECISION = re.compile(r"lat|lon", re.IGNORECASE)
+
+# csv bytes parsed and written at a time when streaming into Parquet
+STREAM_BATCH_BYTES = 64 * 1024**2
+# csv files, spread over the first batch, that the column types are taken from.
+# Most hold one plant, so a single file says little about a column.
+SAMPLE_FILES = 256
+
+# output path -> lock held while something is being ingested into it
+_ingest_locks = {}
+_ingest_locks_guard = threading.Lock()
+
+
+def ingest_lock(out_path):
+    """Lock for an output file, so one thread ingests it and the others wait.
+
+    Kept here rather than in the streamlit script, which is re-run (and
+    its globals rebuilt) on every interaction.
+    """
+    with _ingest_locks_guard:
+        return _ingest_locks.setdefault(os.path.normpath(out_path), threading.Lock())
+
+
+def compact(df, label="data"):
+    """Return a copy of a frame with smaller column types.
+
+    Repeated strings become categoricals, key columns nullable integers and
+    other numbers are downcast, except coordinates. Prints the memory
+    before and after.
+    """
+    before = df.memory_usage(deep=True).sum()
+    df = df.copy()
+    for column in df.columns:
+        series = df[column]
+        if str(column).lower() in KEY_COLUMNS:
+            numbers = pd.to_numeric(series, errors="coerce")
+            if numbers.notna().sum() == series.notna().sum() and (
+                numbers.dropna() % 1 == 0
+            ).all():
+                df[column] = numbers.astype("Int32")
+                continue
+        if pd.api.types.is_bool_dtype(series) or isinstance(
+            series.dtype, pd.CategoricalDtype
+        ):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series):
+            if not FULL_PRECISION.search(str(column)):
+                df[column] = pd.to_numeric(series, downcast="float")
+        elif series.nunique(dropna=True) <= CATEGORY_RATIO * len(series):
+            df[column] = series.astype("category")
+    after = df.memory_usage(deep=True).sum()
+    print(f"Compacted {label}: {before / 2**20:.1f} MB -> {after / 2**20:.1f} MB")
+    return df
+
+
+def open_csv(source):
+    """A path as is, csv contents given as bytes as a file object."""
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def sample_sources(sources, count=None):
+    """Up to `count` (SAMPLE_FILES) sources spread evenly over the list."""
+    count = count or SAMPLE_FILES
+    step = max(1, len(sources) // count)
+    return sources[::step][:count]
+
+
+def infer_dtypes(sample, columns=None):
+    """Explicit dtypes for a family of csvs, taken from a sample of them.
+
+    A column is a number only when every value in the whole sample parses
+    as one, so a blank cell or a header-only file doesn't decide its type.
+
+    Args:
+      - sample (list): csv paths or contents as bytes
+      - columns (list): only read these columns
+
+    Returns:
+      - dict of column -> "float64" or "string"
+    """
+    frame = read_csv_batch(sample, None, columns)
+    return {
+        column: "float64" if pd.api.types.is_numeric_dtype(dtype) else "string"
+        for column, dtype in frame.dtypes.items()
+    }
+
+
+def coerce(df, dtypes):
+    for column, dtype in dtypes.items():
+        if column not in df.columns:
+            continue
+        if dtype == "float64":
+            numbers = pd.to_numeric(df[column], errors="coerce")
+            lost = int((numbers.isna() & df[column].notna()).sum())
+            if lost:
+                print(
+                    f"warning: {lost} values of column {column} are not numbers,"
+                    " stored as missing"
+                )
+            df[column] = numbers
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def read_one_csv(source, dtypes, columns=None):
+    try:
+        return pd.read_csv(
+            open_csv(source), index_col=None, header=0, usecols=columns, dtype=dtypes
+        )
+    except ValueError:
+        # a stray value that doesn't fit the dtypes, coerce it instead
+        return coerce(pd.read_csv(open_csv(source), usecols=columns), dtypes)
+
+
+def read_csv_batch(sources, dtypes, columns=None):
+    """Read and concatenate a batch of csvs with fixed dtypes.
+
+    Sources are paths or csv contents as bytes. Files sharing the header of
+    the first one are joined as text and parsed by a single read_csv call,
+    the rest are read one by one.
+    """
+    header = None
+    bodies = []
+    frames = []
+    for source in sources:
+        if isinstance(source, bytes):
+            first_line, newline, body = source.partition(b"\n")
+            first_line += newline
+        else:
+            try:
+                with open(source, "rb") as file:
+                    first_line = file.readline()
+                    body = file.read()
+            except OSError as e:
+                print(e)
+                print("skipping unreadable csv", source)
+                continue
+        if header is None:
+            header = first_line
+        if first_line != header:
+            frames.append(read_one_csv(source, dtypes, columns))
+            continue
+        if body and not body.endswith(b"\n"):
+            body += b"\n"
+        bodies.append(body)
+    if bodies:
+        text = io.BytesIO(header.rstrip(b"\r\n") + b"\n" + b"".join(bodies))
+        try:
+            frames.append(
+                pd.read_csv(
+                    text, index_col=None, header=0, usecols=columns, dtype=dtypes
+                )
+            )
+        except ValueError:
+            text.seek(0)
+            frames.append(coerce(pd.read_csv(text, usecols=columns), dtypes))
+    if not frames:
+        return pd.DataFrame(
+            {column: pd.Series(dtype=t) for column, t in (dtypes or {}).items()}
+        )
+    return pd.concat(frames, axis=0, ignore_index=True)
+
+
+def conform(df, dtypes):
+    """Cast a frame to the column types of the first one written."""
+    for column, dtype in dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            # each row group keeps its own dictionary
+            df[column] = df[column].astype("category")
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def arrow_schema(df):
+    """Schema of a frame, with room for more categories in later batches."""
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_dictionary(field.type):
+            schema = schema.set(
+                i, field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+            )
+    return schema
+
+
+def combine_csv_stream(contents, out_path, columns=None, batch_bytes=STREAM_BATCH_BYTES):
+    """Parse csv contents as they arrive and append them to one Parquet file.
+
+    Only about `batch_bytes` of csv text is held at a time. The dtypes
+    inferred from a sample of the first batch are applied to every file
+    and the first batch is compacted; later batches are cast to its types.
+
+    Args:
+      - contents (iterable): csv contents as bytes
+      - out_path (string): Parquet file to write
+      - columns (list): only read these columns
+
+    Returns:
+      - out_path, or "" when there was nothing to read
+    """
+    tmp_path = f"{out_path}.tmp"
+    dtypes = None
+    # types of the first batch written, the Parquet schema follows them
+    writer_dtypes = {}
+    writer = None
+
+    def flush(batch):
+        nonlocal dtypes, writer
+        if dtypes is None:
+            dtypes = infer_dtypes(sample_sources(batch), columns)
+        frame = read_csv_batch(batch, dtypes, columns)
+        if frame.empty:
+            return
+        if writer is None:
+            frame = compact(frame, out_path)
+            writer_dtypes.update(frame.dtypes.to_dict())
+            os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+            writer = pq.ParquetWriter(tmp_path, arrow_schema(frame))
+        else:
+            frame = conform(frame, writer_dtypes)
+        writer.write_table(
+            pa.Table.from_pandas(frame, schema=writer.schema, preserve_index=False)
+        )
+
+    batch, size = [], 0
+    try:
+        for data in contents:
+            batch.append(data)
+            size += len(data)
+            if size >= batch_bytes:
+                flush(batch)
+                batch, size = [], 0
+        if batch:
+            flush(batch)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            os.remove(tmp_path)
+        raise
+    if writer is None:
+        return ""
+    writer.close()
+    # readers only ever see a complete file
+    os.replace(tmp_path, out_path)
+    return out_path
@@ -0,0 +1,92 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# seconds a WebDAV directory listing is reused before listing it again
+LISTING_TTL = 600
+# listings in flight at once
+MAX_CONCURRENT_LISTINGS = 16
+
+_lock = threading.Lock()
+_listings = {}
+_stats = {"hits": 0, "misses": 0, "catalog_hits": 0}
+_catalog = None
+
+
+def use_catalog(catalog):
+    """Answer listings from a catalog.Catalog when it has the folder."""
+    global _catalog
+    _catalog = catalog
+
+
+def list_dir(client, path, ttl=LISTING_TTL):
+    """List a WebDAV folder, reusing a result younger than `ttl` seconds.
+
+    Results are keyed by path, so they are shared by every session and
+    every caller. Failed listings are not cached and re-raise. Folders in
+    the SQLite catalog are answered from it without a request.
+    """
+    if _catalog is not None:
+        names = _catalog.children(path)
+        if names is not None:
+            with _lock:
+                _stats["catalog_hits"] += 1
+            return names
+    now = time.time()
+    with _lock:
+        cached = _listings.get(path)
+        if cached is not None and cached[0] > now:
+            _stats["hits"] += 1
+            return list(cached[1])
+        _stats["misses"] += 1
+    result = client.list(path)
+    with _lock:
+        _listings[path] = (time.time() + ttl, result)
+    return list(result)
+
+
+def list_many(client, paths, ttl=LISTING_TTL):
+    """List several folders concurrently.
+
+    Returns:
+      - dict mapping each path that could be listed to its listing
+    """
+    paths = list(dict.fromkeys(paths))
+    listings = {}
+    if not paths:
+        return listings
+
+    def safe_list(path):
+        try:
+            return list_dir(client, path, ttl)
+        except Exception as e:
+            print(e)
+            print("could not list", path)
+            return None
+
+    with ThreadPoolExecutor(
+        max_workers=min(MAX_CONCURRENT_LISTINGS, len(paths))
+    ) as executor:
+        for path, result in zip(paths, executor.map(safe_list, paths)):
+            if result is not None:
+                listings[path] = result
+    return listings
+
+
+def invalidate(path=None):
+    """Forget one cached listing, or all of them."""
+    with _lock:
+        if path is None:
+            _listings.clear()
+        else:
+            _listings.pop(path, None)
+
+
+def stats():
+    with _lock:
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "catalog_hits": _stats["catalog_hits"],
+            "cached_paths": len(_listings),
+        }
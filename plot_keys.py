@@ -0,0 +1,86 @@
+import re
+import pandas as pd
+
+# (season, sensor) -> function turning a detection "plot" column into fieldbook plot numbers
+NORMALIZERS = {}
+
+# fields 6 and 8 of an underscore separated plot name, e.g.
+# MAC_Field_Scanner_Season_10_Range_11_Column_23 -> range 11, column 23
+RANGE_COLUMN_UNDERSCORE = re.compile(r"^(?:[^_]*_){6}([^_]*)_[^_]*_([^_]*)")
+RANGE_COLUMN_SPACE = re.compile(r"^(?:[^ ]* ){6}([^ ]*) [^ ]* ([^ ]*)")
+
+
+def register(season, *sensors):
+    """Register a plot normalizer for a season and one or more sensors.
+
+    A sensor of None makes it the season-wide default. Normalizers map
+    missing or unrecognised plots to <NA>.
+    """
+
+    def decorator(normalizer):
+        for sensor in sensors:
+            NORMALIZERS[(season, sensor)] = normalizer
+        return normalizer
+
+    return decorator
+
+
+def plot_strings(plot):
+    """Plots as strings, whole floats without ".0" and missing ones as <NA>.
+
+    Plot columns with a gap are read as floats, so 12.0 must give "12".
+    """
+    numbers = pd.to_numeric(plot, errors="coerce")
+    whole = numbers.notna() & (numbers % 1 == 0)
+    text = plot.astype("string")
+    text[whole] = numbers[whole].astype("int64").astype("string")
+    text[plot.isna()] = pd.NA
+    return text
+
+
+def range_column_key(plot, pattern):
+    """Join the zero-padded range and column captured by `pattern`."""
+    parts = plot_strings(plot).str.extract(pattern)
+    return parts[0].str.zfill(2) + parts[1].str.zfill(2)
+
+
+@register("10", "stereoTop", "scanner3DTop")
+def season_10_rgb_3d(plot):
+    return range_column_key(plot, RANGE_COLUMN_UNDERSCORE).astype("Int64")
+
+
+@register("10", "flirIrCamera")
+def season_10_flir(plot):
+    return range_column_key(plot, RANGE_COLUMN_UNDERSCORE)
+
+
+@register("10", "ps2Top")
+def season_10_ps2(plot):
+    return range_column_key(plot, RANGE_COLUMN_SPACE)
+
+
+@register("11", None)
+def season_11(plot):
+    return plot_strings(plot).str.zfill(4)
+
+
+def apply_normalizer(normalizer, plot):
+    """Run a normalizer on the distinct plot values only and broadcast back."""
+    codes, uniques = pd.factorize(plot, use_na_sentinel=False)
+    keys = normalizer(pd.Series(uniques, dtype=object))
+    return pd.Series(keys.array.take(codes), index=plot.index, name=plot.name)
+
+
+def normalize_plot(df, season, sensor):
+    """Rewrite df["plot"] with the normalizer registered for season and sensor.
+
+    Args:
+      - df (pandas df): plant detection data with a "plot" column
+      - season (string): "Season 10" or just "10"
+      - sensor (string): selected sensor
+    """
+    season = season.split(" ")[-1]
+    normalizer = NORMALIZERS.get((season, sensor), NORMALIZERS.get((season, None)))
+    if normalizer is not None and "plot" in df.columns:
+        df["plot"] = apply_normalizer(normalizer, df["plot"])
+    return df
@@ -0,0 +1,160 @@
+import io
+import mmap
+import numpy as np
+
+PLY_TYPES = {
+    "char": "i1",
+    "int8": "i1",
+    "uchar": "u1",
+    "uint8": "u1",
+    "short": "i2",
+    "int16": "i2",
+    "ushort": "u2",
+    "uint16": "u2",
+    "int": "i4",
+    "int32": "i4",
+    "uint": "u4",
+    "uint32": "u4",
+    "float": "f4",
+    "float32": "f4",
+    "double": "f8",
+    "float64": "f8",
+}
+BYTE_ORDER = {"binary_little_endian": "<", "binary_big_endian": ">", "ascii": "="}
+
+
+def parse_header(buffer):
+    """Parse a PLY header.
+
+    Args:
+      - buffer (bytes-like): the start of a PLY file
+
+    Returns:
+      - (format, elements, header_length) where elements is a list of
+        (name, count, properties) and properties a list of (name, type, is_list)
+    """
+    end = bytes(buffer[:65536]).find(b"end_header")
+    if not bytes(buffer[:3]) == b"ply" or end == -1:
+        raise ValueError("not a PLY buffer")
+    header_length = bytes(buffer[: end + 64]).index(b"\n", end) + 1
+    lines = bytes(buffer[:header_length]).decode("ascii").splitlines()
+    ply_format = None
+    elements = []
+    for line in lines[1:]:
+        parts = line.split()
+        if not parts:
+            continue
+        if parts[0] == "format":
+            ply_format = parts[1]
+        elif parts[0] == "element":
+            elements.append((parts[1], int(parts[2]), []))
+        elif parts[0] == "property":
+            if parts[1] == "list":
+                elements[-1][2].append((parts[4], parts[3], True))
+            else:
+                elements[-1][2].append((parts[2], parts[1], False))
+    if ply_format not in BYTE_ORDER:
+        raise ValueError(f"unsupported PLY format {ply_format}")
+    return ply_format, elements, header_length
+
+
+def element_dtype(properties, byte_order):
+    if any(is_list for _, _, is_list in properties):
+        raise ValueError("list properties are only supported after the vertices")
+    return np.dtype(
+        [(name, byte_order + PLY_TYPES[ply_type]) for name, ply_type, _ in properties]
+    )
+
+
+def read_vertices(source):
+    """Decode the vertex element of a PLY file into a structured array.
+
+    Binary PLYs are viewed in place with np.frombuffer, so no copy is made of
+    a bytes buffer or of a memory-mapped file.
+
+    Args:
+      - source (bytes-like or string): PLY contents or a path to a PLY file
+
+    Returns:
+      - NumPy structured array with one field per vertex property
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as phile:
+            source = mmap.mmap(phile.fileno(), 0, access=mmap.ACCESS_READ)
+    ply_format, elements, offset = parse_header(source)
+    byte_order = BYTE_ORDER[ply_format]
+    if ply_format == "ascii":
+        skip = 0
+        for name, count, properties in elements:
+            if name == "vertex":
+                return np.loadtxt(
+                    io.BytesIO(bytes(source[offset:])),
+                    dtype=element_dtype(properties, byte_order),
+                    skiprows=skip,
+                    max_rows=count,
+                    ndmin=1,
+                )
+            skip += count
+    else:
+        for name, count, properties in elements:
+            dtype = element_dtype(properties, byte_order)
+            if name == "vertex":
+                return np.frombuffer(source, dtype=dtype, count=count, offset=offset)
+            offset += dtype.itemsize * count
+    raise ValueError("PLY has no vertex element")
+
+
+def vertex_xyz(vertices):
+    """Return an (N, 3) float64 array of the vertex coordinates."""
+    return np.column_stack(
+        [vertices["x"], vertices["y"], vertices["z"]]
+    ).astype(np.float64, copy=False)
+
+
+def voxel_downsample(xyz, voxel_size):
+    """Replace the points falling in each voxel by their centroid."""
+    voxels = np.floor((xyz - xyz.min(axis=0)) / voxel_size).astype(np.int64)
+    dims = voxels.max(axis=0) + 1
+    keys = (voxels[:, 0] * dims[1] + voxels[:, 1]) * dims[2] + voxels[:, 2]
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    return np.column_stack(
+        [np.bincount(inverse, weights=xyz[:, i]) / counts for i in range(3)]
+    )
+
+
+# voxel size growth per try. Doubling it leaves a surface like a leaf with
+# a quarter of its points (a volume an eighth), so levels jumped 4-8x; small
+# steps make each level about half the previous one
+LOD_STEP = 2 ** (1 / 6)
+
+
+def lod_pyramid(xyz, min_points=2000, base_divisions=1024, step=LOD_STEP):
+    """Build voxel-grid levels of detail for a point cloud.
+
+    Level 0 is the full cloud. The voxel size grows by `step` until the cloud
+    shrinks to at most half of the previous level, which becomes the next
+    level, and so on until a level holds at most `min_points` points.
+
+    Returns:
+      - list of (N, 3) arrays ordered from finest to coarsest
+    """
+    levels = [xyz]
+    if len(xyz) <= min_points:
+        return levels
+    voxel_size = float(np.ptp(xyz, axis=0).max()) / base_divisions
+    if voxel_size == 0:
+        return levels
+    while len(levels[-1]) > min_points:
+        level = voxel_downsample(levels[-1], voxel_size)
+        voxel_size *= step
+        if len(level) <= len(levels[-1]) // 2:
+            levels.append(level)
+    return levels
+
+
+def pick_level(levels, point_budget):
+    """Index of the finest level that fits in the point budget."""
+    for i, level in enumerate(levels):
+        if len(level) <= point_budget:
+            return i
+    return len(levels) - 1
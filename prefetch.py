@@ -0,0 +1,164 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+import traceback
+from collections import Counter, deque
+
+import artifacts
+
+# average bytes per second all prefetch workers together may download
+PREFETCH_BANDWIDTH = int(
+    float(os.environ.get("DASHBOARD_PREFETCH_MB_PER_S", "20")) * 1024**2
+)
+# prefetching pauses once the artifact store is this full, so it never
+# evicts what users asked for
+PREFETCH_DISK_SHARE = 0.8
+PREFETCH_WORKERS = 2
+# steps ahead prefetched along each direction the user moved in
+PREFETCH_DEPTH = 3
+# date changes remembered per session
+HISTORY_SIZE = 20
+
+
+class NavigationModel:
+    """Guesses the next date positions from the steps a user took so far."""
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.steps = deque(maxlen=history_size)
+        self.last = None
+
+    def observe(self, position):
+        if self.last is not None and position != self.last:
+            self.steps.append(position - self.last)
+        self.last = position
+
+    def predict(self, position, count, depth=PREFETCH_DEPTH):
+        """Positions in [0, count) likely to be visited next, most likely first.
+
+        Recent steps weigh more than old ones, and each step is followed up
+        to `depth` times. The direct neighbours are always included.
+        """
+        weights = Counter({1: 0.1, -1: 0.1, 2: 0.05, -2: 0.05})
+        for age, step in enumerate(reversed(self.steps)):
+            for k in range(1, depth + 1):
+                weights[step * k] += 0.8**age * 0.5 ** (k - 1)
+        ranked = sorted(weights, key=lambda offset: (-weights[offset], abs(offset)))
+        return [
+            position + offset
+            for offset in ranked
+            if 0 <= position + offset < count and offset != 0
+        ]
+
+
+class Prefetcher:
+    """Background workers that run download jobs ahead of the user.
+
+    Jobs are scheduled per group (one per browser session). Scheduling a
+    group again drops its jobs that have not started, so the queue follows
+    the latest selection. Downloads are paced to PREFETCH_BANDWIDTH, as
+    measured by the growth of the artifact store plus the bytes it was told
+    were read into memory, and skipped while the store is past
+    PREFETCH_DISK_SHARE of its quota.
+    """
+
+    def __init__(
+        self,
+        workers=PREFETCH_WORKERS,
+        bandwidth=PREFETCH_BANDWIDTH,
+        disk_share=PREFETCH_DISK_SHARE,
+    ):
+        self.workers = workers
+        self.bandwidth = bandwidth
+        self.disk_share = disk_share
+        self.cond = threading.Condition()
+        # (priority, sequence, group, generation, key, job)
+        self.queue = []
+        self.sequence = itertools.count()
+        self.generations = {}
+        self.done = set()
+        self.in_flight = set()
+        self.stats = {
+            "done": 0,
+            "dropped": 0,
+            "skipped_disk": 0,
+            "failed": 0,
+            "bytes": 0,
+        }
+        for i in range(workers):
+            threading.Thread(target=self.run, name=f"prefetch-{i}", daemon=True).start()
+
+    def schedule(self, group, jobs):
+        """Replace the pending jobs of `group`.
+
+        Args:
+          - group (hashable): who the jobs are for, usually a session
+          - jobs (list): (key, callable) pairs, most urgent first. Keys
+            already done or running are left out.
+        """
+        with self.cond:
+            generation = self.generations.get(group, 0) + 1
+            self.generations[group] = generation
+            for priority, (key, job) in enumerate(jobs):
+                if key in self.done or key in self.in_flight:
+                    continue
+                heapq.heappush(
+                    self.queue,
+                    (priority, next(self.sequence), group, generation, key, job),
+                )
+            self.cond.notify_all()
+
+    def next_job(self):
+        with self.cond:
+            while True:
+                while not self.queue:
+                    self.cond.wait()
+                _, _, group, generation, key, job = heapq.heappop(self.queue)
+                if (
+                    generation != self.generations[group]
+                    or key in self.done
+                    or key in self.in_flight
+                ):
+                    self.stats["dropped"] += 1
+                    continue
+                self.in_flight.add(key)
+                return key, job
+
+    def disk_full(self):
+        stats = artifacts.get_store().stats()
+        return stats["bytes"] >= self.disk_share * stats["quota_bytes"]
+
+    def run(self):
+        store = artifacts.get_store()
+        while True:
+            key, job = self.next_job()
+            try:
+                if self.disk_full():
+                    self.stats["skipped_disk"] += 1
+                    continue
+                start = time.time()
+                before = store.stats()
+                job()
+                after = store.stats()
+                pulled = max(after["bytes"] - before["bytes"], 0) + (
+                    after["transferred_bytes"] - before["transferred_bytes"]
+                )
+                with self.cond:
+                    self.done.add(key)
+                    self.stats["done"] += 1
+                    self.stats["bytes"] += pulled
+                # each worker gets its share of the bandwidth budget
+                wait = pulled * self.workers / self.bandwidth - (time.time() - start)
+                if wait > 0:
+                    time.sleep(wait)
+            except Exception:
+                print(traceback.format_exc())
+                self.stats["failed"] += 1
+            finally:
+                with self.cond:
+                    self.in_flight.discard(key)
+
+    def pending(self):
+        with self.cond:
+            return len(self.queue)
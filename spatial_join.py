@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+# detections further than this from every clustered plant are dropped (meters)
+MATCH_TOLERANCE_M = 0.05
+METERS_PER_DEGREE_LAT = 110540.0
+METERS_PER_DEGREE_LON = 111320.0
+
+
+def to_meters(lat, lon, origin):
+    """Project lat/lon onto a local flat grid in meters around `origin`."""
+    lat0, lon0 = origin
+    return np.column_stack(
+        [
+            (lon - lon0) * METERS_PER_DEGREE_LON * np.cos(np.radians(lat0)),
+            (lat - lat0) * METERS_PER_DEGREE_LAT,
+        ]
+    )
+
+
+def nearest_within(query, reference, tolerance):
+    """Index of the nearest reference point within tolerance for each query.
+
+    Reference points are bucketed in a grid of `tolerance` sized cells sorted
+    by cell key, so every query only looks at the 3x3 cells around it. All
+    steps are vectorized over the query points.
+
+    Args:
+      - query (array): (N, 2) points in meters
+      - reference (array): (M, 2) points in meters
+      - tolerance (float): largest accepted distance in meters
+
+    Returns:
+      - (N,) int array of reference row numbers, -1 where nothing is in range
+    """
+    match = np.full(len(query), -1, dtype=np.int64)
+    if len(query) == 0 or len(reference) == 0:
+        return match
+    low = np.minimum(query.min(axis=0), reference.min(axis=0))
+    ref_cells = np.floor((reference - low) / tolerance).astype(np.int64)
+    query_cells = np.floor((query - low) / tolerance).astype(np.int64)
+    # one spare column of cells on each side keeps neighbour keys unique
+    width = max(ref_cells[:, 1].max(), query_cells[:, 1].max()) + 3
+    ref_keys = (ref_cells[:, 0] + 1) * width + ref_cells[:, 1] + 1
+    order = np.argsort(ref_keys, kind="stable")
+    ref_keys = ref_keys[order]
+    best = np.full(len(query), np.inf)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            keys = (query_cells[:, 0] + 1 + dx) * width + query_cells[:, 1] + 1 + dy
+            lo = np.searchsorted(ref_keys, keys, side="left")
+            hi = np.searchsorted(ref_keys, keys, side="right")
+            for step in range(int((hi - lo).max())):
+                rows = np.nonzero(lo + step < hi)[0]
+                candidates = order[lo[rows] + step]
+                dist = np.hypot(*(query[rows] - reference[candidates]).T)
+                closer = dist < best[rows]
+                best[rows[closer]] = dist[closer]
+                match[rows[closer]] = candidates[closer]
+    match[best > tolerance] = -1
+    return match
+
+
+def spatial_merge(left, right, on=("lat", "lon"), tolerance=MATCH_TOLERANCE_M):
+    """Inner join two frames on their nearest lat/lon within a tolerance.
+
+    Replaces merging on rounded coordinates, which drops rows whose
+    coordinates only differ by floating point noise. Every left row is kept
+    at most once with the columns of its nearest right row; the coordinates
+    of the left frame are kept.
+
+    Args:
+      - left, right (pandas df): frames with lat/lon columns
+      - on (tuple): names of the latitude and longitude columns
+      - tolerance (float): largest accepted distance in meters
+    """
+    lat, lon = on
+    left_lat = pd.to_numeric(left[lat]).to_numpy(dtype=np.float64)
+    left_lon = pd.to_numeric(left[lon]).to_numpy(dtype=np.float64)
+    right_lat = pd.to_numeric(right[lat]).to_numpy(dtype=np.float64)
+    right_lon = pd.to_numeric(right[lon]).to_numpy(dtype=np.float64)
+    left_ok = np.isfinite(left_lat) & np.isfinite(left_lon)
+    right_ok = np.nonzero(np.isfinite(right_lat) & np.isfinite(right_lon))[0]
+    origin = (np.nanmean(left_lat), np.nanmean(left_lon))
+    match = np.full(len(left), -1, dtype=np.int64)
+    nearest = nearest_within(
+        to_meters(left_lat[left_ok], left_lon[left_ok], origin),
+        to_meters(right_lat[right_ok], right_lon[right_ok], origin),
+        tolerance,
+    )
+    hit = nearest >= 0
+    nearest[hit] = right_ok[nearest[hit]]
+    match[left_ok] = nearest
+    found = match >= 0
+    matched_right = (
+        right.drop(columns=[lat, lon]).iloc[match[found]].reset_index(drop=True)
+    )
+    matched_left = left.loc[found].reset_index(drop=True)
+    overlap = matched_left.columns.intersection(matched_right.columns)
+    return pd.concat(
+        [
+            matched_left.rename(columns={c: f"{c}_x" for c in overlap}),
+            matched_right.rename(columns={c: f"{c}_y" for c in overlap}),
+        ],
+        axis=1,
+    )
@@ -0,0 +1,44 @@
+"""Time every plot normalizer: python tests/benchmark_plot_keys.py [rows]
+
+Rows are built from the normalizer's fixture. "direct" runs the normalizer
+on every row, "deduplicated" goes through apply_normalizer as the
+dashboard does.
+"""
+import os
+import sys
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plot_keys
+from test_plot_keys import FIXTURES
+
+
+def benchmark(rows=100000, repeat=5):
+    """(season, sensor) -> (direct, deduplicated) seconds for `rows` rows."""
+    timings = {}
+    for key, values, expected in FIXTURES:
+        normalizer = plot_keys.NORMALIZERS[key]
+        plot = pd.Series(values * (rows // len(values)), dtype=object)
+        got = plot_keys.apply_normalizer(normalizer, plot)
+        assert got.tolist() == expected * (rows // len(values)), key
+        timings[key] = tuple(
+            min(timeit.repeat(run, number=1, repeat=repeat))
+            for run in (
+                lambda: normalizer(plot),
+                lambda: plot_keys.apply_normalizer(normalizer, plot),
+            )
+        )
+    return timings
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{rows} rows, best of 5")
+    for (season, sensor), (direct, deduplicated) in benchmark(rows).items():
+        print(
+            f"season {season} {sensor or 'default'}: direct {direct * 1000:.1f} ms,"
+            f" deduplicated {deduplicated * 1000:.1f} ms"
+        )
@@ -0,0 +1,97 @@
+import io
+
+import pandas as pd
+
+import artifacts
+import fetch_ipc
+import ingest
+
+
+def plant_csv(name, plot, volume):
+    return f"plant_name,plot,volume,lat\n{name},{plot},{volume},33.0{plot}\n".encode()
+
+
+def test_stream_matches_reading_each_csv(tmp_path):
+    contents = [plant_csv(f"plant_{i % 3}", i, i / 2) for i in range(40)]
+    streamed = ingest.combine_csv_stream(
+        iter(contents), str(tmp_path / "streamed.parquet"), batch_bytes=256
+    )
+    expected = pd.concat(
+        [pd.read_csv(io.BytesIO(data)) for data in contents], ignore_index=True
+    )
+    result = pd.read_parquet(streamed)
+    pd.testing.assert_frame_equal(
+        result.astype({"plant_name": str, "plot": "int64", "volume": "float64"}),
+        expected,
+    )
+
+
+def test_stream_keeps_categories_first_batch_lacks(tmp_path):
+    contents = [plant_csv("plant_a", 1, 1.0)] * 10 + [plant_csv("plant_b", 2, 2.0)]
+    out_path = ingest.combine_csv_stream(
+        iter(contents), str(tmp_path / "out.parquet"), batch_bytes=64
+    )
+    assert pd.read_parquet(out_path)["plant_name"].iloc[-1] == "plant_b"
+
+
+def test_stream_of_nothing_writes_nothing(tmp_path):
+    out_path = tmp_path / "out.parquet"
+    assert ingest.combine_csv_stream(iter([]), str(out_path)) == ""
+    assert not out_path.exists()
+
+
+def test_blank_or_empty_first_csv_does_not_decide_types(tmp_path):
+    header_only = b"plant_name,genotype,volume\n"
+    blank = b"plant_name,genotype,volume\nplant_0,,\n"
+    rest = [f"plant_{i},G{i},{i}.5\n".encode() for i in range(1, 5)]
+    contents = [header_only, blank] + [b"plant_name,genotype,volume\n" + r for r in rest]
+    out_path = ingest.combine_csv_stream(contents, str(tmp_path / "out.parquet"))
+    result = pd.read_parquet(out_path)
+    assert list(result["genotype"].dropna()) == ["G1", "G2", "G3", "G4"]
+    assert pd.api.types.is_float_dtype(result["volume"])
+
+
+def test_strings_past_the_first_batch_are_reported(tmp_path, capsys):
+    contents = [plant_csv("plant_a", 1, 1.0), plant_csv("plant_b", 2, "broken")]
+    ingest.combine_csv_stream(contents, str(tmp_path / "out.parquet"), batch_bytes=1)
+    assert "1 values of column volume are not numbers" in capsys.readouterr().out
+
+
+def test_member_batches_follow_archive_order(monkeypatch):
+    def fetch_span(url, span, auth=None):
+        return [(entry, entry["path"].encode()) for entry, _ in span[2]]
+
+    monkeypatch.setattr(fetch_ipc, "fetch_span", fetch_span)
+    entries = [
+        {"block": block, "file_size": 100, "path": str(block)}
+        for block in (900, 3, 5000, 40000)
+    ]
+    batches = fetch_ipc.iter_member_batches("url", entries, gap_tolerance=0)
+    assert [data for batch in batches for _, data in batch] == [
+        b"3",
+        b"900",
+        b"5000",
+        b"40000",
+    ]
+
+
+def test_member_index_is_rescanned_when_the_tar_changes(tmp_path, monkeypatch):
+    validators = {"size": "1024", "etag": "a"}
+    scans = []
+
+    def scan_remote_tar(url, suffix, auth=None):
+        scans.append(url)
+        return [(len(scans), 10, "plants/p.csv")]
+
+    store = artifacts.ArtifactStore(str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(fetch_ipc, "remote_validators", lambda url, auth: dict(validators))
+    monkeypatch.setattr(fetch_ipc, "scan_remote_tar", scan_remote_tar)
+    monkeypatch.setattr(artifacts, "get_store", lambda: store)
+    index_path = str(tmp_path / "index.json")
+    assert fetch_ipc.load_or_scan_members("url", index_path, ".csv") == [
+        (1, 10, "plants/p.csv")
+    ]
+    fetch_ipc.load_or_scan_members("url", index_path, ".csv")
+    assert len(scans) == 1
+    validators["etag"] = "b"
+    assert fetch_ipc.load_or_scan_members("url", index_path, ".csv")[0][0] == 2
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import plot_keys
+
+# (season, sensor), sample plots and the keys they must produce
+FIXTURES = [
+    (
+        ("10", "stereoTop"),
+        ["MAC_Field_Scanner_Season_10_Range_11_Column_3"],
+        [1103],
+    ),
+    (
+        ("10", "scanner3DTop"),
+        ["MAC_Field_Scanner_Season_10_Range_2_Column_14"],
+        [214],
+    ),
+    (
+        ("10", "flirIrCamera"),
+        ["MAC_Field_Scanner_Season_10_Range_2_Column_14"],
+        ["0214"],
+    ),
+    (
+        ("10", "ps2Top"),
+        ["MAC Field Scanner Season 10 Range 7 Column 9"],
+        ["0709"],
+    ),
+    (("11", None), [12, "345"], ["0012", "0345"]),
+]
+
+
+def normalize(season, sensor, values):
+    df = pd.DataFrame({"plot": pd.Series(values, dtype=object)})
+    return plot_keys.normalize_plot(df, season, sensor)["plot"].tolist()
+
+
+@pytest.mark.parametrize("key, values, expected", FIXTURES)
+def test_fixtures(key, values, expected):
+    assert normalize(*key, values) == expected
+
+
+@pytest.mark.parametrize("key, values, expected", FIXTURES)
+def test_missing_plots_become_na(key, values, expected):
+    got = normalize(*key, values + [np.nan, None])
+    assert got[:-2] == expected
+    assert got[-2] is pd.NA and got[-1] is pd.NA
+
+
+@pytest.mark.parametrize(
+    "sensor", ["stereoTop", "scanner3DTop", "flirIrCamera", "ps2Top"]
+)
+def test_unrecognised_season_10_names_become_na(sensor):
+    assert normalize("10", sensor, ["Range 3", "", "plot_12"]) == [pd.NA] * 3
+
+
+def test_season_11_mixed_types():
+    # a plot column with a gap is read as floats
+    values = [12, "12", 12.0, "0345", 345.0, np.nan]
+    assert normalize("Season 11", "flirIrCamera", values) == [
+        "0012",
+        "0012",
+        "0012",
+        "0345",
+        "0345",
+        pd.NA,
+    ]
+
+
+def test_repeated_values_keep_row_order_and_index():
+    df = pd.DataFrame(
+        {"plot": ["MAC_Field_Scanner_Season_10_Range_1_Column_2", np.nan] * 3},
+        index=list("abcdef"),
+    )
+    plot = plot_keys.normalize_plot(df, "Season 10", "stereoTop")["plot"]
+    assert list(plot.index) == list("abcdef")
+    assert plot.tolist() == [102, pd.NA] * 3
+
+
+def test_unknown_season_is_left_alone():
+    assert normalize("12", "stereoTop", ["a", 1]) == ["a", 1]
@@ -0,0 +1,24 @@
+import numpy as np
+
+import ply_io
+
+
+def leaf(points):
+    """A curved surface, as the scanner sees a plant."""
+    u = np.random.default_rng(0).random((points, 2))
+    return np.column_stack([u[:, 0], u[:, 1], 0.3 * np.sin(6 * u[:, 0]) * u[:, 1]])
+
+
+def test_levels_of_detail_about_halve():
+    levels = ply_io.lod_pyramid(leaf(100000))
+    sizes = [len(level) for level in levels]
+    assert sizes[0] == 100000
+    assert sizes[-1] <= 2000
+    for finer, coarser in zip(sizes, sizes[1:]):
+        assert finer / 3 <= coarser <= finer / 2
+
+
+def test_pick_level_fits_the_budget():
+    levels = ply_io.lod_pyramid(leaf(100000))
+    level = ply_io.pick_level(levels, 20000)
+    assert len(levels[level]) <= 20000 < len(levels[level - 1])
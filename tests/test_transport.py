@@ -0,0 +1,150 @@
+import itertools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import transport
+
+SMALL_RANGE = {"Range": "bytes=0-1023"}
+
+
+@pytest.fixture
+def stand_in_server():
+    """Start local HTTP servers answering with `respond(path, count)`.
+
+    `respond` returns (status, seconds to wait before answering), count
+    numbers the requests the server got so far.
+    """
+    servers = []
+
+    def start(respond):
+        counter = itertools.count()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, delay = respond(self.path, next(counter))
+                time.sleep(delay)
+                body = b"x" * 1024 if status == 200 else b""
+                self.send_response(status)
+                if status in transport.THROTTLE_STATUSES:
+                    self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(transport, "BACKOFF_BASE", 0.001)
+    with transport.PolicySession() as session:
+        yield session
+
+
+def governor_of(url):
+    return transport.governor(url.split("://", 1)[1])
+
+
+def latency_profile(session, url, requests_count, **kwargs):
+    """p99 latency in seconds of small ranged GETs."""
+    latencies = []
+    for _ in range(requests_count):
+        start = time.time()
+        session.get(url, headers=SMALL_RANGE, **kwargs).raise_for_status()
+        latencies.append(time.time() - start)
+    latencies.sort()
+    return latencies[int(len(latencies) * 0.99)]
+
+
+def test_range_length():
+    assert transport.range_length({"Range": "bytes=0-1023"}) == 1024
+    assert transport.range_length({"range": "bytes=10-10"}) == 1
+    assert transport.range_length({"Range": "bytes=100-"}) is None
+    assert transport.range_length({"Range": "bytes=0-1,5-6"}) is None
+    assert transport.range_length(None) is None
+
+
+def test_throttled_requests_are_retried_and_halve_the_limit(stand_in_server, session):
+    url = stand_in_server(lambda path, count: (503 if count < 2 else 200, 0))
+    assert session.get(url).status_code == 200
+    stats = governor_of(url).snapshot()
+    assert stats["retries"] == 2
+    assert stats["throttled"] == 2
+    assert stats["concurrency_limit"] == transport.INITIAL_CONCURRENCY // 4
+
+
+def test_last_error_is_returned_after_the_retries(stand_in_server, session):
+    url = stand_in_server(lambda path, count: (500, 0))
+    assert session.get(url, retries=1).status_code == 500
+    assert governor_of(url).snapshot()["retries"] == 1
+
+
+def test_hedging_cuts_the_tail(stand_in_server, session):
+    # every 50th request is slow, the duplicate sent for it is not
+    def respond(path, count):
+        return 200, 0.3 if count % 50 == 49 else 0.005
+
+    without = latency_profile(session, stand_in_server(respond), 200, hedge=False)
+    url = stand_in_server(respond)
+    hedged = latency_profile(session, url, 200)
+    assert without >= 0.3
+    assert hedged < 0.2
+    assert governor_of(url).snapshot()["hedge_wins"] >= 3
+
+
+def test_large_and_unranged_requests_are_not_hedged(stand_in_server, session):
+    url = stand_in_server(lambda path, count: (200, 0.3 if path == "/slow" else 0))
+    for _ in range(transport.HEDGE_MIN_SAMPLES):
+        session.get(f"{url}/", headers=SMALL_RANGE)
+    large = {"Range": f"bytes=0-{transport.HEDGE_MAX_BYTES}"}
+    session.get(f"{url}/slow", headers=large)
+    session.get(f"{url}/slow")
+    stats = governor_of(url).snapshot()
+    assert stats["hedges"] == 0
+    # their latencies don't count towards the hedging threshold
+    assert stats["hedge_after_ms"] < 100
+    session.get(f"{url}/slow", headers=SMALL_RANGE)
+    assert governor_of(url).snapshot()["hedges"] == 1
+
+
+def test_retry_call_leaves_request_errors_to_the_session():
+    calls = []
+
+    def refused():
+        calls.append(1)
+        raise requests.ConnectionError("connection refused")
+
+    with pytest.raises(requests.ConnectionError):
+        transport.retry_call(refused, retries=2)
+    assert len(calls) == 1
+
+
+def test_retry_call_retries_a_broken_body(stand_in_server, session, monkeypatch):
+    monkeypatch.setattr(transport, "BACKOFF_BASE", 0.001)
+    url = stand_in_server(lambda path, count: (200, 0))
+    attempts = []
+
+    def download():
+        attempts.append(1)
+        with session.get(url, stream=True) as response:
+            if len(attempts) == 1:
+                # as a connection dropped half way through the body does
+                raise requests.exceptions.ChunkedEncodingError("connection broken")
+            return response.content
+
+    assert transport.retry_call(download, retries=2) == b"x" * 1024
+    assert len(attempts) == 2
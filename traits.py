@@ -0,0 +1,134 @@
+import argparse
+import os
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import fetch_ipc as fipc
+import ply_io
+
+# edge of the voxels used to estimate plant volume, in point cloud units (m)
+VOXEL_SIZE = 0.01
+HEIGHT_PERCENTILES = [50, 90, 95, 99]
+# plants fetched and handed to the process pool at a time
+BATCH_SIZE = 256
+
+
+def plant_traits(xyz, voxel_size=VOXEL_SIZE):
+    """Geometric traits of one plant point cloud.
+
+    Args:
+      - xyz (array): (N, 3) point coordinates
+
+    Returns:
+      - dict of point count, height percentiles above the lowest point,
+        bounding box extents and occupied voxel volume
+    """
+    traits = {"point_count": len(xyz)}
+    if len(xyz) == 0:
+        return traits
+    low = xyz.min(axis=0)
+    extents = xyz.max(axis=0) - low
+    heights = np.percentile(xyz[:, 2] - low[2], HEIGHT_PERCENTILES)
+    for percentile, height in zip(HEIGHT_PERCENTILES, heights):
+        traits[f"height_p{percentile}"] = height
+    # not "height_max", data_analysis drops min/max columns
+    traits["height_top"] = extents[2]
+    traits["extent_x"], traits["extent_y"], traits["extent_z"] = extents
+    voxels = np.floor((xyz - low) / voxel_size).astype(np.int64)
+    dims = voxels.max(axis=0) + 1
+    keys = (voxels[:, 0] * dims[1] + voxels[:, 1]) * dims[2] + voxels[:, 2]
+    traits["voxel_volume"] = len(np.unique(keys)) * voxel_size**3
+    return traits
+
+
+def traits_from_ply(item):
+    plant_name, ply_buffer = item
+    try:
+        traits = plant_traits(ply_io.vertex_xyz(ply_io.read_vertices(ply_buffer)))
+    except Exception as e:
+        print(e)
+        print("could not decode ply for", plant_name)
+        traits = {"point_count": 0}
+    traits["plant_name"] = plant_name
+    return traits
+
+
+def extract_date_traits(fetcher, out_path, name_filter="final", processes=None):
+    """Compute traits for every plant in a Fetcher's tar and write one table.
+
+    Plys are fetched in batches with coalesced range requests and decoded and
+    measured across a process pool while the next batch downloads.
+
+    Returns:
+      - path of the written Parquet file, keyed by plant_name like the
+        volumes_entropy csvs, or "" when no plant could be fetched
+    """
+    ipath = fetcher.tar_url()
+    plant_names = fetcher.index_date.keys()
+    rows = []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = None
+        for i in range(0, len(plant_names), BATCH_SIZE):
+            entries = []
+            for plant_name in plant_names[i : i + BATCH_SIZE]:
+                entries.extend(
+                    ply
+                    for ply in fetcher.index_date.get(plant_name, [])
+                    if name_filter in ply["filename"]
+                )
+            fetched = fetcher.fetch_members(ipath, entries)
+            if pending is not None:
+                rows.extend(pending)
+            pending = executor.map(
+                traits_from_ply,
+                [(Path(ply["path"]).parent.stem, buf) for ply, buf in fetched],
+                chunksize=16,
+            )
+        if pending is not None:
+            rows.extend(pending)
+    if not rows:
+        return ""
+    traits_df = pd.DataFrame(rows)
+    traits_df = traits_df[
+        ["plant_name"] + [c for c in traits_df.columns if c != "plant_name"]
+    ]
+    float_cols = traits_df.select_dtypes("float64").columns
+    traits_df[float_cols] = traits_df[float_cols].astype("float32")
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    tmp_path = f"{out_path}.tmp"
+    traits_df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extract per-plant geometric traits for a scan date"
+    )
+    parser.add_argument("season", help="season number, e.g. 14")
+    parser.add_argument("crop")
+    parser.add_argument("date", help="level 2 scanner3DTop date folder")
+    parser.add_argument("index_filename", help="local segmentation pointclouds index")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    fetcher = fipc.Fetcher(
+        "individually_called_point_clouds",
+        args.season,
+        "level_2",
+        args.date,
+        args.crop,
+        args.index_filename,
+    )
+    print(
+        extract_date_traits(
+            fetcher,
+            # named by scan day so data_analysis can find it for the selected date
+            f"plant_traits/{args.crop}_{args.date[:10]}_{args.season}.parquet",
+            processes=args.processes,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Maximum number of keep-alive connections kept open to a single host
+MAX_CONNECTIONS_PER_HOST = 16
+# requests in flight to a host before the governor has seen any throttling
+INITIAL_CONCURRENCY = 8
+
+# (connect, read) seconds before a request without its own timeout gives up
+REQUEST_TIMEOUT = (5, 30)
+MAX_RETRIES = 4
+# seconds of the first backoff, doubled on each retry up to the cap
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+RETRY_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+# errors raised while reading a response body, after the session handed the
+# response back, so it never retried them
+BODY_ERRORS = (
+    requests.exceptions.ChunkedEncodingError,
+    urllib3.exceptions.ProtocolError,
+    urllib3.exceptions.ReadTimeoutError,
+)
+# methods that are safe to send twice
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PROPFIND"}
+# a duplicate GET is sent once the first is slower than this latency
+# quantile of its host, measured over the last LATENCY_WINDOW responses
+HEDGE_QUANTILE = 0.95
+# only ranged GETs of at most this many bytes are hedged (and timed), a
+# large transfer is bound by bandwidth and a duplicate would just add load
+HEDGE_MAX_BYTES = 1024 * 1024
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+_lock = threading.Lock()
+_session = None
+_request_counts = {}
+_governors = {}
+_hedge_pool = None
+
+
+def _count_request(response, *args, **kwargs):
+    host = urlsplit(response.url).netloc
+    with _lock:
+        _request_counts[host] = _request_counts.get(host, 0) + 1
+
+
+class HostGovernor:
+    """Adaptive concurrency limit and latency record for one host.
+
+    The limit grows by one for every `limit` successful responses and halves
+    on 429/503 (additive increase, multiplicative decrease), staying between
+    1 and MAX_CONNECTIONS_PER_HOST. A Retry-After pauses the host. Latencies
+    are only kept for the small requests that may be hedged.
+    """
+
+    def __init__(self, limit=INITIAL_CONCURRENCY):
+        self.cond = threading.Condition()
+        self.limit = float(limit)
+        self.active = 0
+        self.paused_until = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {"retries": 0, "hedges": 0, "hedge_wins": 0, "throttled": 0}
+
+    def acquire(self, blocking=True):
+        with self.cond:
+            while True:
+                paused = self.paused_until - time.time()
+                if paused <= 0 and self.active < int(self.limit):
+                    self.active += 1
+                    return True
+                if not blocking:
+                    return False
+                self.cond.wait(paused if paused > 0 else None)
+
+    def release(self, status=None, latency=None):
+        with self.cond:
+            self.active -= 1
+            if status in THROTTLE_STATUSES:
+                self.limit = max(1.0, self.limit / 2)
+                self.stats["throttled"] += 1
+            elif status is not None and status < 500:
+                self.limit = min(
+                    float(MAX_CONNECTIONS_PER_HOST), self.limit + 1 / self.limit
+                )
+                if latency is not None:
+                    self.latencies.append(latency)
+            self.cond.notify_all()
+
+    def pause(self, seconds):
+        with self.cond:
+            self.paused_until = max(self.paused_until, time.time() + seconds)
+
+    def hedge_delay(self):
+        """Latency past which a request is duplicated, None until known."""
+        with self.cond:
+            if len(self.latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * HEDGE_QUANTILE), len(ordered) - 1)]
+
+    def snapshot(self):
+        delay = self.hedge_delay()
+        with self.cond:
+            return dict(
+                self.stats,
+                concurrency_limit=int(self.limit),
+                in_flight=self.active,
+                hedge_after_ms=None if delay is None else round(delay * 1000),
+            )
+
+
+def governor(host):
+    with _lock:
+        if host not in _governors:
+            _governors[host] = HostGovernor()
+        return _governors[host]
+
+
+def _pool():
+    global _hedge_pool
+    with _lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(
+                max_workers=4 * MAX_CONNECTIONS_PER_HOST, thread_name_prefix="hedge"
+            )
+        return _hedge_pool
+
+
+def backoff(attempt):
+    """Full-jitter exponential backoff in seconds."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+
+
+def retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        # missing, or given as an HTTP date
+        return 0.0
+
+
+def range_length(headers):
+    """Bytes asked for by a single "bytes=start-end" Range, else None."""
+    value = CaseInsensitiveDict(headers or {}).get("Range", "")
+    try:
+        unit, spec = value.split("=", 1)
+        start, end = spec.split("-")
+        length = int(end) - int(start) + 1
+    except ValueError:
+        # no Range, an open or suffix range, or several ranges
+        return None
+    return length if unit.strip() == "bytes" else None
+
+
+def _send(send, host_governor, method, url, kwargs, timed):
+    # the caller holds a slot of host_governor
+    start = time.time()
+    try:
+        response = send(method, url, **kwargs)
+    except Exception:
+        host_governor.release()
+        raise
+    latency = time.time() - start if timed else None
+    host_governor.release(response.status_code, latency)
+    return response
+
+
+def _close(future):
+    if future.exception() is None:
+        future.result().close()
+
+
+def _attempt(send, host_governor, method, url, hedge, kwargs):
+    """One try, duplicated once if it is slower than the host's p95."""
+    host_governor.acquire()
+    delay = host_governor.hedge_delay() if hedge else None
+    if delay is None:
+        return _send(send, host_governor, method, url, kwargs, hedge)
+    pending = {_pool().submit(_send, send, host_governor, method, url, kwargs, True)}
+    done, _ = wait(pending, timeout=delay)
+    if not done and host_governor.acquire(blocking=False):
+        host_governor.stats["hedges"] += 1
+        hedge_future = _pool().submit(
+            _send, send, host_governor, method, url, kwargs, True
+        )
+        pending.add(hedge_future)
+    else:
+        hedge_future = None
+    fallback, error = None, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                error = future.exception()
+            elif future.result().status_code in RETRY_STATUSES and pending:
+                # keep waiting for the other copy
+                fallback = future
+            else:
+                if future is hedge_future:
+                    host_governor.stats["hedge_wins"] += 1
+                for loser in pending:
+                    loser.add_done_callback(_close)
+                if fallback is not None:
+                    fallback.result().close()
+                return future.result()
+    if fallback is not None:
+        return fallback.result()
+    raise error
+
+
+def send_with_policy(send, method, url, **kwargs):
+    """Send a request with a timeout, retries, hedging and the host's governor.
+
+    Connection errors, timeouts and RETRY_STATUSES of idempotent methods are
+    retried up to MAX_RETRIES times after a jittered exponential backoff, or
+    the server's Retry-After when longer. Ranged GETs of at most
+    HEDGE_MAX_BYTES slower than the host's p95 latency for such requests get
+    one duplicate, and the first good response wins.
+
+    Args:
+      - send (callable): sends one request, e.g. requests.Session.request
+      - retries (int): overrides MAX_RETRIES
+      - hedge (bool): overrides hedging, which defaults to small ranged GETs
+
+    Returns:
+      - the response, which has an error status if the last try had one
+    """
+    retries = kwargs.pop("retries", MAX_RETRIES)
+    hedge = kwargs.pop("hedge", None)
+    method = method.upper()
+    if method not in IDEMPOTENT_METHODS:
+        retries = 0
+    if hedge is None:
+        length = range_length(kwargs.get("headers"))
+        hedge = method == "GET" and length is not None and length <= HEDGE_MAX_BYTES
+    if kwargs.get("timeout") is None:
+        kwargs["timeout"] = REQUEST_TIMEOUT
+    host_governor = governor(urlsplit(url).netloc)
+    for attempt in range(retries + 1):
+        try:
+            response = _attempt(send, host_governor, method, url, hedge, kwargs)
+        except RETRY_ERRORS as e:
+            if attempt == retries:
+                raise
+            print(f"retrying {method} {url}: {e}")
+            delay = backoff(attempt)
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            print(f"retrying {method} {url}: HTTP {response.status_code}")
+            delay = max(backoff(attempt), retry_after(response))
+            if response.status_code in THROTTLE_STATUSES:
+                host_governor.pause(retry_after(response))
+            response.close()
+        host_governor.stats["retries"] += 1
+        time.sleep(delay)
+
+
+def broke_body(error):
+    """Whether an error was raised reading a response body, not sending it."""
+    if isinstance(error, BODY_ERRORS):
+        return True
+    # requests reports a stalled body read as a ConnectionError
+    return (
+        isinstance(error, requests.ConnectionError)
+        and bool(error.args)
+        and isinstance(error.args[0], urllib3.exceptions.ReadTimeoutError)
+    )
+
+
+def retry_call(func, retries=MAX_RETRIES):
+    """Call func again after a download broke mid-body.
+
+    Failed requests were already retried by the session, so errors raised
+    sending them are passed on rather than retried again.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except (requests.RequestException, *BODY_ERRORS) as e:
+            if attempt == retries or not broke_body(e):
+                raise
+            print(f"retrying after {e}")
+            time.sleep(backoff(attempt))
+
+
+class PolicySession(requests.Session):
+    """Session that sends every request through send_with_policy."""
+
+    def request(self, method, url, **kwargs):
+        return send_with_policy(super().request, method, url, **kwargs)
+
+
+def _build_session(max_connections_per_host):
+    session = PolicySession()
+    adapter = HTTPAdapter(
+        pool_connections=max_connections_per_host,
+        pool_maxsize=max_connections_per_host,
+        pool_block=True,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.hooks["response"].append(_count_request)
+    return session
+
+
+def configure(max_connections_per_host=MAX_CONNECTIONS_PER_HOST):
+    """Rebuild the shared session with a different per-host connection cap."""
+    global _session, MAX_CONNECTIONS_PER_HOST
+    with _lock:
+        MAX_CONNECTIONS_PER_HOST = max_connections_per_host
+        old_session = _session
+        _session = _build_session(max_connections_per_host)
+    if old_session is not None:
+        old_session.close()
+    return _session
+
+
+def get_session():
+    """Return the process-wide pooled session used for all CyVerse traffic."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session(MAX_CONNECTIONS_PER_HOST)
+    return _session
+
+
+def attach(webdav_client):
+    """Make a webdav3 Client send its requests through the shared session."""
+    webdav_client.session = get_session()
+    return webdav_client
+
+
+def pool_stats():
+    """Per-host connection pool statistics for the shared session.
+
+    Returns:
+      - dict keyed by host with the number of requests sent, connections
+        opened and idle connections currently kept alive
+    """
+    stats = {}
+    session = get_session()
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            host = pool.host
+            if pool.port not in (None, 80, 443):
+                host = f"{pool.host}:{pool.port}"
+            stats[host] = {
+                "requests": _request_counts.get(host, 0),
+                "connections_opened": pool.num_connections,
+                "idle_connections": sum(
+                    1 for conn in list(pool.pool.queue) if conn is not None
+                )
+                if pool.pool
+                else 0,
+                "max_connections": MAX_CONNECTIONS_PER_HOST,
+            }
+    return stats
+
+
+def policy_stats():
+    """Concurrency limit, retries and hedging of every host seen so far."""
+    with _lock:
+        governors = dict(_governors)
+    return {host: host_governor.snapshot() for host, host_governor in governors.items()}
+